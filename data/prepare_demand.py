@@ -0,0 +1,53 @@
+import logging
+import argparse
+import pandas as pd
+
+from simobility.core import Clock
+from simobility.core.tools import ReplayDemand
+from simobility.core.demand import save_demand
+import simobility.routers as routers
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s: %(message)s")
+
+"""
+Prepare demand for a simulation: select trips from a time interval, sample,
+map match and filter them once and save the result to a file that can be
+replayed by `simobility.core.demand.PrematchedDemand`.
+
+The input is a feather file created by preprocess_data.py
+"""
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prepare demand file")
+    parser.add_argument("--data-file", help='Input file in "feather" format')
+    parser.add_argument("--output-file", help="Output file in Arrow IPC format")
+    parser.add_argument("--from-datetime", help="Start of the simulation")
+    parser.add_argument("--to-datetime", help="End of the simulation")
+    parser.add_argument("--clock-step", type=int, default=10, help="In seconds")
+    parser.add_argument("--sample-size", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--osrm-server", default=None, help="Map match with OSRM")
+
+    args = parser.parse_args()
+
+    clock = Clock(
+        time_step=args.clock_step, time_unit="s", starting_time=args.from_datetime
+    )
+
+    map_matcher = None
+    if args.osrm_server:
+        map_matcher = routers.OSRMRouter(clock=clock, server=args.osrm_server)
+
+    demand = ReplayDemand(
+        clock,
+        args.data_file,
+        pd.to_datetime(args.from_datetime),
+        pd.to_datetime(args.to_datetime),
+        clock.to_pandas_units(),
+        args.sample_size,
+        map_matcher=map_matcher,
+        seed=args.seed,
+    )
+
+    save_demand(demand, args.output_file)
@@ -17,7 +17,13 @@ class GreedyMatcher:
     Each booking is matched with closest vehicle
     """
 
-    def __init__(self, context: Context, router: BaseRouter, search_radius: int):
+    def __init__(
+        self,
+        context: Context,
+        router: BaseRouter,
+        search_radius: int,
+        num_candidates: int = None,
+    ):
         self.clock = context.clock
         self.fleet = context.fleet
         self.booking_service = context.booking_service
@@ -32,6 +38,10 @@ class GreedyMatcher:
 
         logging.info(f"Search radius: {self.search_radius}")
 
+        # If fleet has a spatial index of idling vehicles, only closest
+        # num_candidates vehicles are considered for each booking
+        self.num_candidates = num_candidates
+
     def step(self) -> List[Itinerary]:
         # bookings in descending order
         bookings = self.booking_service.get_pending_bookings()
@@ -41,7 +51,11 @@ class GreedyMatcher:
         # FIFO
         for booking in bookings:
             if vehicles:
-                vehicle, eta = self.closest_vehicle(booking, vehicles)
+                candidates = self.get_candidates(booking, vehicles)
+                if not candidates:
+                    continue
+
+                vehicle, eta = self.closest_vehicle(booking, candidates)
                 if eta > self.search_radius:
                     continue
 
@@ -57,11 +71,23 @@ class GreedyMatcher:
         vehicles = self.fleet.get_online_vehicles()
         return [v for v in vehicles if self.dispatcher.get_itinerary(v) is None]
 
+    def get_candidates(self, booking: Booking, vehicles: List[Vehicle]) -> List[Vehicle]:
+        """Prefilter vehicles using the fleet spatial index"""
+        if self.num_candidates is None or self.fleet.idle_index is None:
+            return vehicles
+
+        # the index also includes vehicles that are not available, e.g. matched
+        # during this step
+        k = self.num_candidates + max(len(self.fleet.idle_index) - len(vehicles), 0)
+        available = set(vehicles)
+        nearest = self.fleet.nearest_idle_vehicles(booking.pickup, k)
+        return [v for v in nearest if v in available][: self.num_candidates]
+
     def closest_vehicle(
         self, booking: Booking, vehicles: List[Vehicle]
     ) -> Tuple[Vehicle, float]:
 
-        positions = [v.position for v in vehicles]
+        positions = self.fleet.positions([v.id for v in vehicles])
 
         # calculate time distance from pickup to all available vehicles
         distances = self.router.calculate_distance_matrix(positions, [booking.pickup])
@@ -3,16 +3,21 @@ import json
 import pandas as pd
 from pprint import pprint
 from simobility.core.metrics import calculate_metrics
+from simobility.core.state_log import read_state_log
 
 
 def print_metrics(file_name, clock):
     logging.info(f'Reading file {file_name}...')
 
-    data = pd.read_csv(
-        file_name,
-        sep=";",
-        converters={"details": lambda v: eval(v)},
-    )
+    if file_name.endswith((".arrow", ".parquet")):
+        # written by ArrowStateLogWriter
+        data = read_state_log(file_name)
+    else:
+        data = pd.read_csv(
+            file_name,
+            sep=";",
+            converters={"details": lambda v: eval(v)},
+        )
 
     metrics = calculate_metrics(data, clock)
 
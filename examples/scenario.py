@@ -65,7 +65,10 @@ def create_scenario(config):
 
     logging.info(f"Fleet router {fleet_router}")
 
-    fleet_router = routers.CachingRouter(fleet_router)
+    # persistent cache allows to reuse routes in multiple runs
+    fleet_router = routers.CachingRouter(
+        fleet_router, path=config["routers"].get("cache")
+    )
 
     fleet = Fleet(clock, fleet_router)
     fleet.infleet_from_geojson(
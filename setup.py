@@ -24,7 +24,6 @@ setup(
         "scipy>=1.2.1",
         "haversine",
         "geojson",
-        "transitions",
         "geopandas",
         "shapely",
         "requests",
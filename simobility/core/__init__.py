@@ -2,6 +2,7 @@ from .clock import Clock
 from .booking_service import BookingService
 from .dispatcher import Dispatcher
 from .fleet import Fleet
+from .spatial_index import GridIndex
 from .vehicle import Vehicle
 from .itinerary import Itinerary
 from .geo_position import GeographicPosition
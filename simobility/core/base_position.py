@@ -11,8 +11,22 @@ class BasePosition(ABC):
     two coordinates.
     """
 
+    __slots__ = ("_id",)
+
     def __init__(self):
-        self.id = uuid4().hex
+        self._id = None
+
+    @property
+    def id(self) -> str:
+        """A unique id of the position. It is generated on the first access
+        since most of positions never need it"""
+        if self._id is None:
+            self._id = uuid4().hex
+        return self._id
+
+    @id.setter
+    def id(self, value: str):
+        self._id = value
 
     @abstractmethod
     def distance(self, pos) -> float:
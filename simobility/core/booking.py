@@ -1,7 +1,10 @@
 from enum import Enum
-from transitions.core import EventData
-from .state_machine import StateMachine
+import os
+from typing import Callable, List, Optional, Sequence
+import numpy as np
+from .state_machine import StateMachine, StateChange
 from .base_position import BasePosition
+from .geo_position import GeographicPosition
 from .clock import Clock
 
 
@@ -119,15 +122,59 @@ class Booking(StateMachine):
         self.seats = seats
         self.preferences = preferences
 
+        # called when the booking leaves pending state, see BookingService
+        self.pending_listener: Optional[Callable[["Booking"], None]] = None
+
         self.set_pending()
 
-    def on_state_changed(self, event: EventData):
+    @classmethod
+    def create_many(
+        cls, clock: Clock, pickups: Sequence, dropoffs: Sequence, seats: int = 4
+    ) -> List["Booking"]:
+        """ Create bookings from arrays of pickup and dropoff coordinates.
+
+        Parameters
+        ----------
+
+        clock : Clock
+
+        pickups, dropoffs : np.array
+            Arrays of shape (n, 2) with lon/lat coordinates
+
+        seats : int
+            Number of requested seats of each booking
+
+        Returns
+        -------
+
+        bookings : list
+            New bookings in pending state
+        """
+
+        pickups = np.asarray(pickups, dtype=float).reshape(-1, 2).tolist()
+        dropoffs = np.asarray(dropoffs, dtype=float).reshape(-1, 2).tolist()
+
+        # random ids generated at once are much cheaper than uuid4 per booking
+        ids = os.urandom(16 * len(pickups)).hex()
+
+        return [
+            cls(
+                clock,
+                GeographicPosition(*pu),
+                GeographicPosition(*do),
+                seats,
+                booking_id=ids[i * 32: (i + 1) * 32],
+            )
+            for i, (pu, do) in enumerate(zip(pickups, dropoffs))
+        ]
+
+    def on_state_changed(self, event: StateChange):
         """The function is called by the state machine on each state change.
         
         Parameters
         ----------
 
-        event : EventData
+        event : StateChange
             Contains information describing state change like a current state and
             a new state
         """
@@ -161,3 +208,6 @@ class Booking(StateMachine):
             event.kwargs["vid"] = itinerary.vehicle.id
 
         super().on_state_changed(event)
+
+        if self.pending_listener and event.transition.source == States.pending.name:
+            self.pending_listener(self)
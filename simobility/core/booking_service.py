@@ -1,4 +1,5 @@
-from typing import List, Dict
+import heapq
+from typing import List, Dict, Optional, Tuple
 from .booking import Booking
 from .clock import Clock
 
@@ -6,8 +7,11 @@ from .clock import Clock
 class BookingService:
     """ BookingService manages all booking requests that enter a simulation
     from a demand model. Each new booking must be in pending state. After
-    a booking changes its state to any other state it will be removed from the 
+    a booking changes its state to any other state it will be removed from the
     booking service
+
+    Pending bookings are indexed by expiration time, so each step touches
+    only bookings that expire
     """
 
     def __init__(self, clock: Clock, max_pending_time: int):
@@ -26,11 +30,24 @@ class BookingService:
         self._max_pending_time = max_pending_time
         self.clock = clock
 
+        # min-heap of (expiration time, sequence number, booking). Bookings
+        # that left the queue are skipped when they reach the top of the heap
+        self._expirations: List[Tuple[int, int, Booking]] = []
+        self._sequence = 0
+
     def add_booking(self, booking: Booking):
         if not booking.is_pending():
             raise Exception("Booking state is not CREATED")
 
         self._pending_bookings[booking.id] = booking
+        booking.pending_listener = self._remove_booking
+
+        created = booking.created_at
+        if created is not None:
+            # booking expires when (created + max_pending_time) < now
+            expire_at = created + self._max_pending_time + 1
+            heapq.heappush(self._expirations, (expire_at, self._sequence, booking))
+            self._sequence += 1
 
     def add_bookings(self, bookings: List[Booking]):
         for booking in bookings:
@@ -41,24 +58,40 @@ class BookingService:
         """
         return list(self._pending_bookings.values())
 
-    def step(self):
-        # collected booking that are not in pending state and will be
-        # removed from the queue
-        non_pending = []
+    @property
+    def num_bookings(self) -> int:
+        """Number of bookings in the queue"""
+        return len(self._pending_bookings)
 
-        now = self.clock.clock_time
-        for booking in self._pending_bookings.values():
-            if not booking.is_pending():
-                non_pending.append(booking.id)
+    def next_expiration_time(self) -> Optional[int]:
+        """Clock time when the next pending booking expires"""
+        self._drop_removed()
+        if self._expirations:
+            return self._expirations[0][0]
+        return None
 
-            else:
-                created = booking.created_at
+    def _remove_booking(self, booking: Booking):
+        """Called by a booking when it leaves pending state"""
+        if self._pending_bookings.get(booking.id) is booking:
+            del self._pending_bookings[booking.id]
+        booking.pending_listener = None
+
+    def _drop_removed(self):
+        """Remove bookings that already left the queue from the top of the heap"""
+        expirations = self._expirations
+        while expirations and expirations[0][2].id not in self._pending_bookings:
+            heapq.heappop(expirations)
+
+    def step(self):
+        now = self.clock.clock_time
 
-                # check bookings expiration time
-                if created is not None and (created + self._max_pending_time) < now:
-                    booking.set_expired()
-                    non_pending.append(booking.id)
+        expired = []
+        self._drop_removed()
+        while self._expirations and self._expirations[0][0] <= now:
+            expired.append(heapq.heappop(self._expirations))
+            self._drop_removed()
 
-        # delete non pending bookings
-        for id_ in non_pending:
-            del self._pending_bookings[id_]
+        # expire bookings in the order they entered the queue
+        for _, _, booking in sorted(expired, key=lambda item: item[1]):
+            # the booking is removed from the queue by the state change
+            booking.set_expired()
@@ -0,0 +1,300 @@
+import json
+import logging
+from typing import List, Optional
+import numpy as np
+import pyarrow as pa
+
+from .booking import Booking
+from .clock import Clock
+from .tools import ReplayDemand, prepare_trips
+
+# columns of a demand file with map matched and filtered trips
+DEMAND_COLUMNS = ("pickup_lon", "pickup_lat", "dropoff_lon", "dropoff_lat")
+# key of a bucket index in metadata of a demand file
+BUCKETS_KEY = b"simobility.buckets"
+
+
+def _to_seconds(values) -> np.ndarray:
+    """Datetimes to seconds since epoch"""
+    return np.asarray(values, dtype="datetime64[s]").astype(np.int64)
+
+
+def save_demand(demand: ReplayDemand, file_name: str):
+    """ Save demand - filtered, sampled and map matched trips to a file that
+    can be replayed by `PrematchedDemand`. Trips are sorted by pickup time
+    and grouped into buckets - one bucket per clock step.
+
+    The file is in Arrow IPC format with coordinates of trips, the bucket
+    index - times of buckets and offsets of their first trips - is stored
+    in the file metadata.
+
+    >>> demand = ReplayDemand(clock, "rides.feather", ..., map_matcher=router)
+    >>> save_demand(demand, "demand.arrow")
+    >>> demand = PrematchedDemand(clock, "demand.arrow")
+    """
+
+    data = demand.data.sort_values("pickup_datetime", kind="stable")
+
+    pickups = data[["pickup_lon", "pickup_lat"]].to_numpy(float)
+    dropoffs = data[["dropoff_lon", "dropoff_lat"]].to_numpy(float)
+    pickups, dropoffs, mask = prepare_trips(pickups, dropoffs, demand.map_matcher)
+
+    times = _to_seconds(data.pickup_datetime.to_numpy())[mask]
+
+    bucket_times, offsets = np.unique(times, return_index=True)
+    offsets = np.append(offsets, len(times))
+
+    table = pa.table(
+        {
+            "pickup_lon": pickups[:, 0],
+            "pickup_lat": pickups[:, 1],
+            "dropoff_lon": dropoffs[:, 0],
+            "dropoff_lat": dropoffs[:, 1],
+        }
+    )
+
+    index = {"times": bucket_times.tolist(), "offsets": offsets.tolist()}
+    table = table.replace_schema_metadata({BUCKETS_KEY: json.dumps(index)})
+
+    with pa.OSFile(file_name, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+    logging.info(
+        f"Saved {len(times)} trips in {len(bucket_times)} buckets to {file_name}"
+    )
+
+
+class PrematchedDemand:
+    """ Replays demand saved by `save_demand`. The file is memory mapped,
+    bookings of a clock step are created from a slice of coordinate arrays
+    """
+
+    def __init__(self, clock: Clock, file_name: str):
+        self.clock = clock
+
+        self._source = pa.memory_map(file_name)
+        table = pa.ipc.open_file(self._source).read_all()
+
+        # zero copy views of memory mapped columns
+        self._columns = [
+            table.column(name).combine_chunks().to_numpy() for name in DEMAND_COLUMNS
+        ]
+
+        index = json.loads(table.schema.metadata[BUCKETS_KEY])
+        self._offsets = np.array(index["offsets"], dtype=np.int64)
+
+        # clock times of buckets, only buckets that fall exactly on
+        # a clock step are replayed
+        start = _to_seconds(np.datetime64(self.clock.to_datetime(0)))
+        step = self.clock.clock_time_to_seconds(1)
+        times = (np.array(index["times"], dtype=np.int64) - start) / step
+
+        self._buckets = {
+            int(t): idx for idx, t in enumerate(times.tolist()) if t == int(t)
+        }
+        self._times = sorted(self._buckets)
+
+    def __len__(self) -> int:
+        """Total number of trips"""
+        return int(self._offsets[-1])
+
+    def next_event_time(self) -> Optional[int]:
+        """Clock time of the next demand bucket after the current clock time"""
+        idx = np.searchsorted(self._times, self.clock.now, side="right")
+        if idx < len(self._times):
+            return self._times[idx]
+        return None
+
+    def next(self, clock_time: Optional[int] = None) -> List[Booking]:
+        if clock_time is None:
+            clock_time = self.clock.now
+
+        idx = self._buckets.get(clock_time)
+        if idx is None:
+            return []
+
+        start, end = self._offsets[idx], self._offsets[idx + 1]
+        pu_lon, pu_lat, do_lon, do_lat = [c[start:end] for c in self._columns]
+
+        seats = 1
+        return Booking.create_many(
+            self.clock,
+            np.column_stack([pu_lon, pu_lat]),
+            np.column_stack([do_lon, do_lat]),
+            seats,
+        )
+
+
+# columns of a trip file created by data/preprocess_data.py
+TRIP_COLUMNS = ("pickup_datetime",) + DEMAND_COLUMNS
+
+
+def sort_trips(file_name: str, output_file: str, row_group_size: int = 100000):
+    """ Sort trips by pickup time and save them to a Parquet file. Row groups
+    of a sorted file cover short time intervals, so StreamingDemand reads only
+    row groups that overlap with a simulation time interval
+    """
+    import pyarrow.parquet as pq
+
+    table = _dataset(file_name).to_table(columns=list(TRIP_COLUMNS))
+    table = table.sort_by("pickup_datetime")
+    pq.write_table(table, output_file, row_group_size=row_group_size)
+
+
+def _dataset(file_name: str):
+    import pyarrow.dataset as ds
+
+    file_format = "parquet" if file_name.endswith(".parquet") else "feather"
+    return ds.dataset(file_name, format=file_format)
+
+
+class StreamingDemand:
+    """ Replays trips from a file sorted by pickup time without loading the
+    whole file. Only trips from [from_datetime, to_datetime) are read - Arrow
+    dataset filters skip row groups of Parquet files outside of the interval.
+    Trips are read in batches and grouped into buckets - one bucket per clock
+    step, so the memory usage does not depend on the file size.
+
+    Trips are processed the same way as by ReplayDemand, except sampling
+    """
+
+    def __init__(
+        self,
+        clock: Clock,
+        file_name: str,
+        from_datetime,
+        to_datetime,
+        map_matcher=None,
+        batch_size: int = 65536,
+    ):
+        """
+        Parameters
+        ----------
+
+        clock : Clock
+
+        file_name : str
+            Feather or Parquet (*.parquet) file with trips sorted by pickup
+            time, see `sort_trips`
+
+        from_datetime, to_datetime : datetime
+            Time interval of trips
+
+        map_matcher : BaseRouter
+            Router used to map match pickups and dropoffs
+
+        batch_size : int
+            Max number of trips read at once
+        """
+
+        self.clock = clock
+        self.file_name = file_name
+        self.from_datetime = from_datetime
+        self.to_datetime = to_datetime
+        self.map_matcher = map_matcher
+        self.batch_size = batch_size
+
+        self._buckets = self.buckets()
+        self._next_bucket = next(self._buckets, None)
+
+    def _read_batches(self):
+        import pyarrow.dataset as ds
+
+        dataset = _dataset(self.file_name)
+        time_type = dataset.schema.field("pickup_datetime").type
+
+        from_datetime = pa.scalar(self.from_datetime, type=time_type)
+        to_datetime = pa.scalar(self.to_datetime, type=time_type)
+        field = ds.field("pickup_datetime")
+
+        return dataset.to_batches(
+            columns=list(TRIP_COLUMNS),
+            filter=(field >= from_datetime) & (field < to_datetime),
+            batch_size=self.batch_size,
+        )
+
+    def buckets(self):
+        """ Generator of demand buckets in order of clock time. Each bucket is
+        a tuple (clock time, trips) where trips is an array of shape (n, 4) with
+        pickup lon/lat and dropoff lon/lat
+        """
+
+        start = np.datetime64(self.clock.to_datetime(0), "ms").astype(np.int64)
+        step = self.clock.clock_time_to_seconds(1) * 1000
+
+        # trips of the last bucket of a batch, it can continue in the next batch
+        carry_times = np.empty(0, dtype=np.int64)
+        carry_trips = np.empty((0, 4))
+
+        for batch in self._read_batches():
+            if batch.num_rows == 0:
+                continue
+
+            ms = batch.column(0).cast(pa.timestamp("ms")).to_numpy()
+            # round to the closest clock step
+            times = np.round((ms.astype(np.int64) - start) / step).astype(np.int64)
+            trips = np.column_stack(
+                [batch.column(i).to_numpy() for i in range(1, 5)]
+            ).astype(float)
+
+            times = np.concatenate([carry_times, times])
+            trips = np.concatenate([carry_trips, trips])
+
+            if np.any(np.diff(times) < 0):
+                raise Exception(f"Trips in {self.file_name} are not sorted by time")
+
+            complete = np.searchsorted(times, times[-1], side="left")
+            yield from _split_buckets(times[:complete], trips[:complete])
+
+            carry_times = times[complete:]
+            carry_trips = trips[complete:]
+
+        yield from _split_buckets(carry_times, carry_trips)
+
+    def next_event_time(self) -> Optional[int]:
+        """Clock time of the next demand bucket after the current clock time"""
+        self._skip_past()
+        if self._next_bucket is None:
+            return None
+
+        clock_time = self._next_bucket[0]
+        if clock_time > self.clock.now:
+            return clock_time
+
+        # the current bucket is not replayed yet, the next one is unknown
+        return self.clock.now + 1
+
+    def _skip_past(self):
+        """Skip buckets that were not replayed in time"""
+        now = self.clock.now
+        while self._next_bucket is not None and self._next_bucket[0] < now:
+            self._next_bucket = next(self._buckets, None)
+
+    def next(self) -> List[Booking]:
+        self._skip_past()
+        if self._next_bucket is None or self._next_bucket[0] != self.clock.now:
+            return []
+
+        _, trips = self._next_bucket
+        self._next_bucket = next(self._buckets, None)
+        return self._create_bookings(trips)
+
+    def _create_bookings(self, trips: np.ndarray) -> List[Booking]:
+        pickups, dropoffs, _ = prepare_trips(
+            trips[:, :2], trips[:, 2:], self.map_matcher
+        )
+
+        seats = 1
+        return Booking.create_many(self.clock, pickups, dropoffs, seats)
+
+
+def _split_buckets(times: np.ndarray, trips: np.ndarray):
+    """Split sorted trips into buckets with the same clock time"""
+    if not len(times):
+        return
+
+    bucket_times, offsets = np.unique(times, return_index=True)
+    offsets = np.append(offsets, len(times))
+    for i, clock_time in enumerate(bucket_times.tolist()):
+        yield clock_time, trips[offsets[i]: offsets[i + 1]]
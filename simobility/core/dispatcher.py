@@ -1,4 +1,5 @@
-from typing import List, Dict, Optional
+import heapq
+from typing import List, Dict, Optional, Set, Tuple
 from .state_transitions import update_next_bookings
 from .state_transitions import do_job
 from .itinerary import Itinerary
@@ -9,15 +10,36 @@ class Dispatcher:
     """Simulation controller connects vehicles, itineraries and bookings.
     Each of the entities is updated on each steps of a simulation. The main
     goal of Dispatcher is to process itineraries
+
+    Dispatcher processes only itineraries that can progress: new or updated
+    ones and itineraries of vehicles that arrive at the current step. Other
+    itineraries are waiting in a wake-up schedule keyed by the vehicle ETA.
     """
 
     def __init__(self):
         self.itineraries: Dict[Vehicle, Itinerary] = {}
 
+        # itineraries to process on the next step
+        self._due: Set[Vehicle] = set()
+        # min-heap of (wake-up time, sequence number, vehicle)
+        self._schedule: List[Tuple[int, int, Vehicle]] = []
+        # the latest scheduled wake-up time of each vehicle
+        self._wake_up: Dict[Vehicle, int] = {}
+        # the order in which itineraries were dispatched
+        self._order: Dict[Vehicle, int] = {}
+        self._sequence = 0
+
     def dispatch(self, itinerary: Itinerary):
         # TODO: itinerary consistency is a "business logic" level
 
-        self.itineraries[itinerary.vehicle] = itinerary
+        vehicle = itinerary.vehicle
+        if vehicle not in self.itineraries:
+            self._order[vehicle] = self._sequence
+            self._sequence += 1
+
+        self.itineraries[vehicle] = itinerary
+        self._wake_up.pop(vehicle, None)
+        self._due.add(vehicle)
 
     def get_itinerary(self, vehicle: Vehicle) -> Optional[Itinerary]:
         if vehicle in self.itineraries:
@@ -26,13 +48,51 @@ class Dispatcher:
 
     def cancel_itinerary(self, vehicle: Vehicle):
         vehicle.stop()
+        self._remove(vehicle)
+
+    def _remove(self, vehicle: Vehicle):
         del self.itineraries[vehicle]
+        del self._order[vehicle]
+        self._wake_up.pop(vehicle, None)
+        self._due.discard(vehicle)
+
+    def _schedule_wake_up(self, vehicle: Vehicle):
+        """Wake up when the vehicle arrives or on the next step if it
+        is not moving"""
+        if vehicle.is_moving:
+            eta = vehicle.engine.eta
+            self._wake_up[vehicle] = eta
+            heapq.heappush(self._schedule, (eta, self._sequence, vehicle))
+            self._sequence += 1
+        else:
+            self._due.add(vehicle)
+
+    def _pop_due(self) -> List[Vehicle]:
+        """Vehicles with itineraries that can progress, in dispatch order"""
+        due = self._due
+        self._due = set()
+
+        schedule = self._schedule
+        while schedule:
+            eta, _, vehicle = schedule[0]
+            if self._wake_up.get(vehicle) != eta:
+                # itinerary was removed or rescheduled
+                heapq.heappop(schedule)
+            elif eta <= vehicle.engine.now:
+                heapq.heappop(schedule)
+                del self._wake_up[vehicle]
+                due.add(vehicle)
+            else:
+                break
+
+        return sorted(due, key=self._order.__getitem__)
 
     def step(self):
         # finish current job and start next one
 
-        for vehicle, itinerary in self.itineraries.items():
-            # vehicle = self.fleet.get_vehicle(vehicle_id)
+        for vehicle in self._pop_due():
+            itinerary = self.itineraries[vehicle]
+
             # Run until all jobs are done or started job which can't be
             # finished in 1 round (move_to and wait)
 
@@ -70,6 +130,7 @@ class Dispatcher:
             # update states on the next bookings
             update_next_bookings(itinerary)
 
-        self.itineraries = {
-            v: it for v, it in self.itineraries.items() if not it.is_completed()
-        }
+            if itinerary.is_completed():
+                self._remove(vehicle)
+            else:
+                self._schedule_wake_up(vehicle)
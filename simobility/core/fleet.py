@@ -1,4 +1,4 @@
-from typing import List, Type, Dict
+from typing import List, Type, Dict, Optional
 import numpy as np
 import json
 from shapely.geometry import shape
@@ -6,6 +6,9 @@ from .vehicle_engine import VehicleEngine
 from .vehicle import StopReasons, Vehicle
 from .clock import Clock
 from .geo_position import GeographicPosition
+from .fleet_store import FleetStore, NO_ETA
+from .spatial_index import GridIndex
+from .base_position import BasePosition
 from ..routers.base_router import BaseRouter
 from ..utils import read_polygon
 
@@ -14,37 +17,139 @@ class Fleet:
     """ Keeps all online and offline vehicles in one place. Creates
     an engine for each vehicle using a router. This router tells vehicles
     how to move in a simulated world.
+
+    In columnar mode vehicle states, positions and routes are also kept in
+    FleetStore arrays and fleet updates are vectorized. Vehicles keep their
+    engines and routes, so this mode uses more memory.
+
+    If `idle_index` is provided, the fleet keeps positions of idling vehicles
+    in the spatial index to search vehicles close to a position.
     """
 
-    def __init__(self, clock: Clock, router: Type[BaseRouter]):
+    def __init__(
+        self,
+        clock: Clock,
+        router: Type[BaseRouter],
+        columnar: bool = False,
+        idle_index: Optional[GridIndex] = None,
+    ):
         # {vehicle_id: Vehicle}
         self._vehicles: Dict[str, Vehicle] = {}
         self.router = router
         self.clock = clock
 
+        self.store: Optional[FleetStore] = None
+        if columnar:
+            self.store = FleetStore()
+
+        self.idle_index = idle_index
+
     def get_online_vehicles(self) -> List[Vehicle]:
         """Return vehicles that are currently active (have status not offile)"""
 
+        if self.store is not None:
+            vehicles = self.store.vehicles
+            return [vehicles[slot] for slot in self.store.online_slots()]
+
         return [v for v in self._vehicles.values() if not v.is_offline()]
 
     def infleet(self, vehicle: Vehicle, position: GeographicPosition):
         """Add a new vehicle to the fleet and put it at a particular location
         in the simulater world."""
 
-        engine = create_engine(position, self.router, self.clock)
+        if self.store is not None:
+            engine = self.store.create_engine(vehicle, position, self.router, self.clock)
+        else:
+            engine = create_engine(position, self.router, self.clock)
+
+        if self.store is not None or self.idle_index is not None:
+            vehicle.state_listener = self._on_vehicle_state_changed
+
         vehicle.install_engine(engine)
 
         self._vehicles[vehicle.id] = vehicle
 
+    def _on_vehicle_state_changed(self, vehicle: Vehicle):
+        if self.store is not None:
+            self.store.state[vehicle.engine.slot] = vehicle._state
+
+        if self.idle_index is not None:
+            if vehicle.is_idling():
+                self.idle_index.insert(vehicle, vehicle.position)
+            else:
+                self.idle_index.remove(vehicle)
+
+    def nearest_idle_vehicles(self, position: BasePosition, k: int = 1) -> List[Vehicle]:
+        """The k idling vehicles closest to the position (haversine distance).
+        Requires `idle_index`"""
+        return [v for v, _ in self.idle_index.nearest(position, k)]
+
+    def idle_vehicles_within(self, position: BasePosition, radius: float) -> List[Vehicle]:
+        """Idling vehicles within `radius` km from the position sorted by
+        distance. Requires `idle_index`"""
+        return [v for v, _ in self.idle_index.within(position, radius)]
+
     def get_vehicle(self, vehicle_id: str) -> Vehicle:
         """Returns a vehicle by vehicle id"""
         return self._vehicles[vehicle_id]
 
+    def positions(self, vehicle_ids: List[str]) -> List[BasePosition]:
+        """Current positions of vehicles. In columnar mode positions of
+        vehicles that are not moving or move along straight lines
+        (LinearRoute) are calculated at once by FleetStore. Positions on
+        routes with geometry are calculated by vehicle engines"""
+
+        vehicles = [self._vehicles[vid] for vid in vehicle_ids]
+        if self.store is None:
+            return [v.position for v in vehicles]
+
+        store = self.store
+        slots = np.fromiter(
+            (v.engine.slot for v in vehicles), dtype=np.int64, count=len(vehicles)
+        )
+        lon, lat = store.positions(slots, self.clock.clock_time)
+        positions = [GeographicPosition(x, y) for x, y in zip(lon.tolist(), lat.tolist())]
+
+        geometry = (store.eta[slots] != NO_ETA) & ~store.linear[slots]
+        for idx in np.flatnonzero(geometry).tolist():
+            positions[idx] = vehicles[idx].position
+
+        return positions
+
     def step(self):
         """Implements fleet updates on each simulation iteration"""
+
+        if self.store is not None:
+            # only vehicles that have arrived or are in an inconsistent state
+            # need an update, Vehicle.step raises an exception for the latter
+            now = self.clock.clock_time
+            vehicles = self.store.vehicles
+            for slot in self.store.arrived(now):
+                vehicles[slot].step()
+            for slot in self.store.idling_moving(now):
+                vehicles[slot].step()
+            return
+
         for vehicle in self._vehicles.values():
             vehicle.step()
 
+    def next_arrival_time(self) -> Optional[int]:
+        """Clock time when the next moving vehicle arrives to its destination"""
+
+        now = self.clock.clock_time
+
+        if self.store is not None:
+            eta = self.store.eta[: self.store.size]
+            eta = eta[eta > now]
+            return int(eta.min()) if eta.size else None
+
+        etas = [
+            v.engine.eta
+            for v in self._vehicles.values()
+            if v.engine is not None and v.engine.eta > now
+        ]
+        return min(etas, default=None)
+
     def stop_vehicles(self):
         """Stop all non idling vehicles"""
         for vehicle in self._vehicles.values():
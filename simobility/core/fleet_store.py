@@ -0,0 +1,192 @@
+from typing import List, Optional, Type, Tuple
+import numpy as np
+from .base_position import BasePosition
+from .clock import Clock
+from .vehicle import Vehicle, States
+from .vehicle_engine import VehicleEngine
+from .state_machine import TransitionTable
+from ..routers.base_router import BaseRouter
+from ..routers.linear_route import LinearRoute
+
+# ETA of vehicles without a route - always in the past
+NO_ETA = np.iinfo(np.int64).min
+
+
+class FleetStore:
+    """ Structure of arrays with vehicle states, positions and routes. Each
+    vehicle gets a slot - an index in the arrays. Vehicles and their engines
+    keep working as usual and write all changes to the store (states are
+    updated by Fleet), so per-vehicle and columnar code see the same data.
+
+    The store allows to replace per vehicle loops with vectorized operations,
+    for example, find all vehicles that have arrived to their destinations.
+    Note that the store does not replace vehicles and engines, they keep
+    their routes and the store duplicates this data, so columnar mode uses
+    more memory than the default one.
+
+    All vehicles in a store must share a transition table, state codes
+    are resolved through it.
+
+    Columns:
+    - state - vehicle state code
+    - lon, lat - position where a vehicle stopped last time
+    - origin_lon, origin_lat, dest_lon, dest_lat - current route
+    - created_at - time when the current route was created
+    - eta - time of arrival, NO_ETA if vehicle has no route
+    - linear - the current route is a straight line (LinearRoute), positions
+      on other routes depend on their geometry
+    """
+
+    _columns = (
+        "state",
+        "lon",
+        "lat",
+        "origin_lon",
+        "origin_lat",
+        "dest_lon",
+        "dest_lat",
+        "created_at",
+        "eta",
+        "linear",
+    )
+
+    def __init__(self, capacity: int = 1024):
+        self.size = 0
+        self.vehicles: List[Vehicle] = []
+
+        self.state = np.zeros(capacity, dtype=np.int8)
+        self.lon = np.zeros(capacity)
+        self.lat = np.zeros(capacity)
+        self.origin_lon = np.zeros(capacity)
+        self.origin_lat = np.zeros(capacity)
+        self.dest_lon = np.zeros(capacity)
+        self.dest_lat = np.zeros(capacity)
+        self.created_at = np.zeros(capacity, dtype=np.int64)
+        self.eta = np.full(capacity, NO_ETA, dtype=np.int64)
+        self.linear = np.zeros(capacity, dtype=bool)
+
+        # transition table of vehicles, set when the first vehicle is added
+        self.table: Optional[TransitionTable] = None
+
+    def _grow(self):
+        capacity = max(len(self.state) * 2, 1)
+        for name in self._columns:
+            column = getattr(self, name)
+            fill = NO_ETA if name == "eta" else 0
+            extended = np.full(capacity, fill, dtype=column.dtype)
+            extended[: len(column)] = column
+            setattr(self, name, extended)
+
+    def add(self, vehicle: Vehicle, position: BasePosition) -> int:
+        """Reserve a slot for the vehicle and return slot index"""
+        table = vehicle._transition_table
+        if self.table is None:
+            self.table = table
+        elif table is not self.table:
+            raise Exception("Vehicles in a FleetStore must have the same state transitions")
+
+        if self.size == len(self.state):
+            self._grow()
+
+        slot = self.size
+        self.size += 1
+        self.vehicles.append(vehicle)
+
+        self.state[slot] = vehicle._state
+        self.lon[slot], self.lat[slot] = position.coords
+        return slot
+
+    def create_engine(
+        self,
+        vehicle: Vehicle,
+        position: BasePosition,
+        router: Type[BaseRouter],
+        clock: Clock,
+    ) -> "ColumnarEngine":
+        slot = self.add(vehicle, position)
+        return ColumnarEngine(self, slot, position, router, clock)
+
+    def _in_state(self, state: States) -> np.ndarray:
+        """Mask of vehicles in a specific state"""
+        if self.table is None:
+            return np.zeros(0, dtype=bool)
+        return self.state[: self.size] == self.table.codes[state]
+
+    def slots(self, state: States) -> np.ndarray:
+        """Slots of vehicles in a specific state"""
+        return np.flatnonzero(self._in_state(state))
+
+    def online_slots(self) -> np.ndarray:
+        return np.flatnonzero(~self._in_state(States.offline))
+
+    def arrived(self, now: int) -> np.ndarray:
+        """Slots of moving vehicles that are at the destination at time `now`"""
+        idx = self._in_state(States.moving_to) & (self.eta[: self.size] <= now)
+        return np.flatnonzero(idx)
+
+    def idling_moving(self, now: int) -> np.ndarray:
+        """Slots of idling vehicles with a route that is not finished,
+        the state is inconsistent (see Vehicle.step)"""
+        idx = self._in_state(States.idling) & (self.eta[: self.size] > now)
+        return np.flatnonzero(idx)
+
+    def positions(self, slots: np.ndarray, now: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Vectorized vehicle positions at time `now`. Moving vehicles are
+        placed on a straight line between route origin and destination
+        proportionally to traveled time. It is exact for straight line routes
+        (LinearRouter) and an approximation for routes with geometry, see
+        `linear`.
+        """
+
+        lon = self.lon[slots].copy()
+        lat = self.lat[slots].copy()
+
+        eta = self.eta[slots]
+        moving = eta != NO_ETA
+        if moving.any():
+            created_at = self.created_at[slots][moving]
+            duration = eta[moving] - created_at
+            pcnt = np.clip((now - created_at) / duration, 0, 1)
+
+            origin_lon = self.origin_lon[slots][moving]
+            origin_lat = self.origin_lat[slots][moving]
+            lon[moving] = origin_lon + (self.dest_lon[slots][moving] - origin_lon) * pcnt
+            lat[moving] = origin_lat + (self.dest_lat[slots][moving] - origin_lat) * pcnt
+
+        return lon, lat
+
+
+class ColumnarEngine(VehicleEngine):
+    """VehicleEngine that mirrors its route and position into FleetStore"""
+
+    def __init__(
+        self,
+        store: FleetStore,
+        slot: int,
+        position: BasePosition,
+        router: Type[BaseRouter],
+        clock: Clock,
+    ):
+        super().__init__(position, router, clock)
+        self.store = store
+        self.slot = slot
+
+    def start_move(self, destination: BasePosition):
+        super().start_move(destination)
+
+        route = self.route
+        if route:
+            store, slot = self.store, self.slot
+            store.origin_lon[slot], store.origin_lat[slot] = route.origin.coords
+            store.dest_lon[slot], store.dest_lat[slot] = route.destination.coords
+            store.created_at[slot] = route.created_at
+            store.eta[slot] = route.arrival_time
+            store.linear[slot] = isinstance(route, LinearRoute)
+
+    def end_move(self):
+        super().end_move()
+
+        store, slot = self.store, self.slot
+        store.lon[slot], store.lat[slot] = self._position.coords
+        store.eta[slot] = NO_ETA
+        store.linear[slot] = False
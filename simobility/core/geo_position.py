@@ -1,5 +1,5 @@
 from haversine import haversine
-import json
+from weakref import WeakValueDictionary
 from typing import Tuple, Dict
 from .base_position import BasePosition
 
@@ -10,8 +10,21 @@ class GeographicPosition(BasePosition):
     associated with positions on Earth (geographic position)
     
     lon/lat -> x/y order of coordinates
+
+    Positions are created in large numbers (e.g. route waypoints), so
+    they store only a tuple of coordinates
     """
 
+    __slots__ = ("_coords", "__weakref__")
+
+    # max distance between two points to consider them the same
+    _distance_threshold = 0.005
+
+    # positions shared by GeographicPosition.interned
+    _interned: "WeakValueDictionary[Tuple[float, float], GeographicPosition]" = (
+        WeakValueDictionary()
+    )
+
     def __init__(self, lon, lat):
         """
         Params
@@ -28,14 +41,29 @@ class GeographicPosition(BasePosition):
 
         # https://en.wikipedia.org/wiki/Decimal_degrees
         # e.g. the error of precision=6 is ~111 mm
-        self.lat = round(lat, 6)
-        self.lon = round(lon, 6)
-
-        # max distance between two points to consider them the same
-        self._distance_threshold = 0.005
+        self._coords = (round(lon, 6), round(lat, 6))
 
         self._validate()
 
+    @classmethod
+    def interned(cls, lon, lat) -> "GeographicPosition":
+        """Return a shared instance for the coordinates, e.g. for stations
+        or map matched road nodes that are used many times"""
+        key = (round(lon, 6), round(lat, 6))
+        pos = cls._interned.get(key)
+        if pos is None:
+            pos = cls(*key)
+            cls._interned[key] = pos
+        return pos
+
+    @property
+    def lon(self) -> float:
+        return self._coords[0]
+
+    @property
+    def lat(self) -> float:
+        return self._coords[1]
+
     def _validate(self):
         if self.lat > 90 or self.lat < -90:
             raise Exception(f"{self.lat} is not correct latitude")
@@ -55,22 +83,18 @@ class GeographicPosition(BasePosition):
         """
 
         # haversine expects lat/lon of each point
-        return haversine(self.coords[::-1], pos.coords[::-1])
+        return haversine(self._coords[::-1], pos.coords[::-1])
 
     @property
     def coords(self) -> Tuple[float, float]:
-        return (self.lon, self.lat)
+        return self._coords
 
     def __eq__(self, other):
-        return self.id == other.id or self.distance(other) < self._distance_threshold
+        return self is other or self.distance(other) < self._distance_threshold
 
     def to_dict(self):
-        d = {
-            "lat": round(self.lat, 6),
-            "lon": round(self.lon, 6)
-            # 'id': self.id
-        }
-        return d
+        lon, lat = self._coords
+        return {"lat": lat, "lon": lon}
 
     def __repr__(self):
         return f"Position({self.lon}, {self.lat})"
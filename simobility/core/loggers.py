@@ -58,6 +58,50 @@ class InMemoryLogHandler(logging.NullHandler):
         super().handle(record)
 
 
+# objects that receive every state change directly, bypassing logging,
+# see add_state_change_sink
+state_change_sinks = []
+
+
+def add_state_change_sink(sink):
+    """Send all state changes to the sink. A sink is an object with methods
+    `write(state_info)`, `flush()` and `close()`, e.g. ArrowStateLogWriter"""
+    if sink not in state_change_sinks:
+        state_change_sinks.append(sink)
+
+
+def remove_state_change_sink(sink):
+    if sink in state_change_sinks:
+        state_change_sinks.remove(sink)
+
+
+def flush_state_change_sinks():
+    for sink in state_change_sinks:
+        sink.flush()
+
+
+class LogHandlerSink:
+    """Adapter that allows to use logging handlers (e.g. CSVFileHandler) as
+    state change sinks, for example in BackgroundStateLogWriter"""
+
+    def __init__(self, handler: logging.Handler):
+        self.handler = handler
+        if handler.formatter is None:
+            handler.setFormatter(logging.Formatter("%(message)s"))
+
+    def write(self, state_info):
+        record = logging.LogRecord(
+            "simobility.state_changes", logging.INFO, "", 0, state_info, None, None
+        )
+        self.handler.handle(record)
+
+    def flush(self):
+        self.handler.flush()
+
+    def close(self):
+        self.handler.close()
+
+
 def get_simobility_logger(handler=None):
     logger = logging.getLogger("simobility.state_changes")
 
@@ -104,6 +148,3 @@ def disable_loggers():
 
     log = logging.getLogger("urllib3.connectionpool")
     log.setLevel(logging.CRITICAL)
-
-    log = logging.getLogger("transitions.core")
-    log.setLevel(logging.CRITICAL)
@@ -1,5 +1,7 @@
-from typing import Dict
-from pandas import json_normalize
+import json
+from typing import Dict, List
+import numpy as np
+import pandas as pd
 from .state_machine import StateMachine
 from .clock import Clock
 
@@ -13,46 +15,54 @@ def calculate_metrics(data: StateMachine, clock: Clock) -> Dict:
 
     data : StateMachine
         Any object derived the state machine class. The function supports
-        only vehicles and bookings
+        only vehicles and bookings. Details can be dicts or json strings
 
     clock : Clock
         Simulated time tracker
     """
 
-    details = json_normalize(data.details)
+    object_type = data.object_type.to_numpy()
+    to_state = data.to_state.to_numpy()
 
-    idx = ~details.stop.isna()
-    total_distance = details[idx].trip_distance.sum()
-    empty_distance = details[idx & (~details.pickup.isna())].trip_distance.sum()
+    booking_idx = object_type == "booking"
+    vehicle_idx = object_type == "vehicle"
 
-    booking_idx = data.object_type == "booking"
-    vehicle_idx = data.object_type == "vehicle"
+    vehicles = data[vehicle_idx]
+    trips = _vehicle_trips(vehicles)
+    trip_vehicles = trips["uuid"]
+    trip_distance = trips["trip_distance"]
+    trip_duration = trips["trip_duration"]
+    with_pickup = trips["pickup"]
+    with_dropoff = trips["dropoff"]
 
-    waiting_times = data[booking_idx].groupby("uuid").apply(_calc_waiting_time)
+    total_distance = trip_distance.sum()
+    empty_distance = trip_distance[with_pickup].sum()
+
+    times = _booking_times(data[booking_idx])
+
+    waiting_times = times["pickup"] - times["pending"]
     avg_waiting_time = waiting_times[~waiting_times.isna()].mean()
     avg_waiting_time = clock.clock_time_to_seconds(avg_waiting_time)
 
-    trip_times = data[booking_idx].groupby("uuid").apply(_calc_trip_time)
+    trip_times = times["dropoff"] - times["pickup"]
     avg_trip_time = trip_times[~trip_times.isna()].mean()
     avg_trip_time = clock.clock_time_to_seconds(avg_trip_time)
 
-    created = data[booking_idx & (data.to_state == "pending")].shape[0]
-    pickups = data[booking_idx & (data.to_state == "pickup")].shape[0]
-    dropoffs = data[booking_idx & (data.to_state == "dropoff")].shape[0]
-    expired = data[booking_idx & (data.to_state == "expired")].shape[0]
+    booking_states = to_state[booking_idx]
+    created = int(np.count_nonzero(booking_states == "pending"))
+    pickups = int(np.count_nonzero(booking_states == "pickup"))
+    dropoffs = int(np.count_nonzero(booking_states == "dropoff"))
+    expired = int(np.count_nonzero(booking_states == "expired"))
     pickup_rate = pickups / created * 100
 
     num_steps = clock.clock_time
-    num_vehicles = data[vehicle_idx].uuid.unique().shape[0]
+    num_vehicles = vehicles.uuid.unique().shape[0]
 
-    idx = vehicle_idx & (~details.stop.isna())
-
-    total_duration = details[idx].groupby(data[idx].uuid)["trip_duration"].sum()
+    total_duration = trip_duration.groupby(trip_vehicles).sum()
     avg_utilization = (total_duration / num_steps * 100).mean()
     fleet_utilization = total_duration.sum() / (num_steps * num_vehicles) * 100
 
-    idx = idx & (~details.dropoff.isna())
-    total_duration = details[idx].groupby(data[idx].uuid)["trip_duration"].sum()
+    total_duration = trip_duration[with_dropoff].groupby(trip_vehicles[with_dropoff]).sum()
     paid_utilization = (total_duration / num_steps * 100).mean()
     paid_fleet_utilization = total_duration.sum() / (num_steps * num_vehicles) * 100
 
@@ -76,15 +86,217 @@ def calculate_metrics(data: StateMachine, clock: Clock) -> Dict:
     }
 
 
-def _calc_waiting_time(item):
-    vals = dict(item[["to_state", "clock_time"]].values)
-    if "pickup" not in vals:
-        return None
-    return vals["pickup"] - vals["pending"]
+def _vehicle_trips(vehicles: pd.DataFrame) -> Dict:
+    """Vehicle ids, trip distances and durations of finished trips (only
+    vehicles that stopped have trip duration and distance) and whether trips
+    were to a pickup or a dropoff.
+
+    Details are read from columns if the data has them (see
+    ColumnarLogHandler.to_pandas), otherwise from dicts or json strings
+    in the "details" column"""
+
+    if "stop" in vehicles:
+        stopped = vehicles.stop.notna().to_numpy()
+        trips = vehicles[stopped]
+
+        def column(name):
+            if name in trips:
+                return pd.Series(trips[name].to_numpy(dtype=float))
+            return pd.Series(np.full(len(trips), np.nan))
+
+        def has(name):
+            if name in trips:
+                return trips[name].notna().to_numpy()
+            return np.zeros(len(trips), dtype=bool)
+
+        return {
+            "uuid": vehicles.uuid.to_numpy()[stopped],
+            "trip_distance": column("trip_distance"),
+            "trip_duration": column("trip_duration"),
+            "pickup": has("pickup"),
+            "dropoff": has("dropoff"),
+        }
+
+    details = _parse_details(vehicles.details)
+    stopped = np.array([d.get("stop") is not None for d in details], dtype=bool)
+    trips = [d for d, s in zip(details, stopped) if s]
+
+    return {
+        "uuid": vehicles.uuid.to_numpy()[stopped],
+        "trip_distance": pd.Series(_get(trips, "trip_distance"), dtype=float),
+        "trip_duration": pd.Series(_get(trips, "trip_duration")),
+        "pickup": np.array([d.get("pickup") is not None for d in trips], dtype=bool),
+        "dropoff": np.array([d.get("dropoff") is not None for d in trips], dtype=bool),
+    }
+
+
+def _parse_details(details: pd.Series) -> List[Dict]:
+    """Details as dicts, json strings (e.g. read from files) are parsed"""
+    return [
+        json.loads(d) if isinstance(d, str) else d if isinstance(d, dict) else {}
+        for d in details
+    ]
+
+
+def _get(details: List[Dict], key: str) -> List:
+    return [d.get(key) for d in details]
+
+
+def _booking_times(bookings: pd.DataFrame) -> pd.DataFrame:
+    """Clock time when each booking entered pending, pickup and dropoff states.
+    One row per booking, NaN if a booking has not reached a state. If
+    a booking entered a state more than once, the last time is used"""
+
+    states = ["pending", "pickup", "dropoff"]
+
+    bookings = bookings[["uuid", "to_state", "clock_time"]]
+    bookings = bookings[bookings.to_state.isin(states)]
+    bookings = bookings.astype({"uuid": object, "to_state": object})
+    bookings = bookings.drop_duplicates(["uuid", "to_state"], keep="last")
+
+    times = bookings.pivot(index="uuid", columns="to_state", values="clock_time")
+    return times.reindex(columns=states)
+
+
+class MetricsCollector:
+    """ Calculates the same metrics as `calculate_metrics` while a simulation
+    is running, without storing state changes. It is a state change sink:
+
+    >>> collector = MetricsCollector(clock)
+    >>> loggers.add_state_change_sink(collector)
+    >>> simulator.simulate(demand, duration_mins)
+    >>> collector.metrics()
+
+    Metrics are available at any time during a simulation. The collector
+    keeps running counters and sums, per vehicle durations and the times of
+    bookings that are not dropped off or expired yet.
+    """
+
+    def __init__(self, clock: Clock):
+        self.clock = clock
+
+        self.created = 0
+        self.pickups = 0
+        self.dropoffs = 0
+        self.expired = 0
+
+        self.waiting_time = 0
+        self.num_waiting = 0
+        self.trip_time = 0
+        self.num_trips = 0
+
+        self.total_distance = 0.0
+        self.empty_distance = 0.0
+
+        # {vehicle id: total duration of trips}, only vehicles that stopped
+        self.busy_duration: Dict[str, float] = {}
+        self.paid_duration: Dict[str, float] = {}
+        self.vehicles = set()
+
+        # {booking id: {state: clock time}} of active bookings
+        self._bookings: Dict[str, Dict[str, int]] = {}
+
+    def write(self, state_info: Dict):
+        object_type = state_info["object_type"]
+        if object_type == "booking":
+            self._booking_changed(state_info)
+        elif object_type == "vehicle":
+            self._vehicle_changed(state_info)
+
+    def _booking_changed(self, state_info: Dict):
+        bid = state_info["uuid"]
+        to_state = state_info["to_state"]
+        clock_time = state_info["clock_time"]
+
+        if to_state == "pending":
+            self.created += 1
+            self._bookings[bid] = {"pending": clock_time}
+
+        elif to_state == "pickup":
+            self.pickups += 1
+            times = self._bookings.setdefault(bid, {})
+            times["pickup"] = clock_time
+            if "pending" in times:
+                self.waiting_time += clock_time - times["pending"]
+                self.num_waiting += 1
+
+        elif to_state == "dropoff":
+            self.dropoffs += 1
+            times = self._bookings.pop(bid, {})
+            if "pickup" in times:
+                self.trip_time += clock_time - times["pickup"]
+                self.num_trips += 1
+
+        elif to_state == "expired":
+            self.expired += 1
+            self._bookings.pop(bid, None)
+
+    def _vehicle_changed(self, state_info: Dict):
+        vid = state_info["uuid"]
+        self.vehicles.add(vid)
+
+        details = state_info["details"]
+        if details.get("stop") is None:
+            return
+
+        distance = details.get("trip_distance")
+        if distance is not None:
+            self.total_distance += distance
+            if details.get("pickup") is not None:
+                self.empty_distance += distance
+
+        duration = details.get("trip_duration") or 0
+        self.busy_duration[vid] = self.busy_duration.get(vid, 0) + duration
+        if details.get("dropoff") is not None:
+            self.paid_duration[vid] = self.paid_duration.get(vid, 0) + duration
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    @property
+    def num_active_bookings(self) -> int:
+        return len(self._bookings)
+
+    def metrics(self) -> Dict:
+        """Metrics at the current clock time, see `calculate_metrics`"""
+
+        clock = self.clock
+        num_steps = clock.clock_time
+        num_vehicles = len(self.vehicles)
+
+        avg_waiting_time = _ratio(self.waiting_time, self.num_waiting)
+        avg_waiting_time = clock.clock_time_to_seconds(avg_waiting_time)
+
+        avg_trip_time = _ratio(self.trip_time, self.num_trips)
+        avg_trip_time = clock.clock_time_to_seconds(avg_trip_time)
+
+        busy = np.array(list(self.busy_duration.values()), dtype=float)
+        paid = np.array(list(self.paid_duration.values()), dtype=float)
+        fleet_steps = num_steps * num_vehicles
+
+        return {
+            "num_vehicles": num_vehicles,
+            "created": self.created,
+            "expired": self.expired,
+            "pickups": self.pickups,
+            "dropoffs": self.dropoffs,
+            "pickup_rate": _ratio(self.pickups, self.created) * 100,
+            # time in seconds
+            "avg_waiting_time": avg_waiting_time,
+            "avg_trip_time": avg_trip_time,
+            "avg_utilization": _ratio(busy.sum(), len(busy) * num_steps) * 100,
+            "fleet_utilization": _ratio(busy.sum(), fleet_steps) * 100,
+            "avg_paid_utilization": _ratio(paid.sum(), len(paid) * num_steps) * 100,
+            "fleet_paid_utilization": _ratio(paid.sum(), fleet_steps) * 100,
+            "total_distance": self.total_distance,
+            "empty_distance": self.empty_distance,
+            "empty_distance_pcnt": _ratio(self.empty_distance, self.total_distance) * 100,
+        }
 
 
-def _calc_trip_time(item):
-    vals = dict(item[["to_state", "clock_time"]].values)
-    if "dropoff" not in vals:
-        return None
-    return vals["dropoff"] - vals["pickup"]
+def _ratio(a: float, b: float) -> float:
+    """a / b or NaN if b is zero, e.g. before the first booking is created"""
+    return a / b if b else np.nan
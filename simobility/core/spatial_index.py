@@ -0,0 +1,122 @@
+from typing import Dict, Hashable, List, Tuple
+from collections import defaultdict
+from math import cos, floor, radians, pi
+import numpy as np
+from .base_position import BasePosition
+from ..routers.utils import EARTH_RADIUS_KM, haversine_matrix
+
+# length of one degree of latitude
+KM_PER_DEGREE = EARTH_RADIUS_KM * pi / 180
+
+
+class GridIndex:
+    """ Uniform grid over longitude and latitude for fast search of objects
+    close to a position, e.g. idle vehicles close to a pickup location.
+    Objects are indexed by a key and a geographic position.
+
+    >>> index = GridIndex(cell_size=0.5)
+    >>> index.insert(vehicle, vehicle.position)
+    >>> index.nearest(booking.pickup, k=5)
+    [(vehicle, 0.34)]
+    """
+
+    def __init__(self, cell_size: float = 1.0):
+        """
+        Parameters
+        ----------
+
+        cell_size : float
+            Height of a grid cell in km. Cells have the same size in degrees
+            in both directions
+        """
+        self.cell_size = cell_size
+        self._cell_deg = cell_size / KM_PER_DEGREE
+
+        # {cell: {key: (lon, lat)}}
+        self._cells: Dict[Tuple[int, int], Dict[Hashable, Tuple[float, float]]] = defaultdict(dict)
+        # {key: cell}
+        self._keys: Dict[Hashable, Tuple[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._keys
+
+    def _cell(self, lon: float, lat: float) -> Tuple[int, int]:
+        return (floor(lon / self._cell_deg), floor(lat / self._cell_deg))
+
+    def insert(self, key: Hashable, position: BasePosition):
+        """Add an object to the index or update its position"""
+        if key in self._keys:
+            self.remove(key)
+
+        lon, lat = position.coords
+        cell = self._cell(lon, lat)
+        self._cells[cell][key] = (lon, lat)
+        self._keys[key] = cell
+
+    def remove(self, key: Hashable):
+        """Remove an object from the index, do nothing if it is not indexed"""
+        cell = self._keys.pop(key, None)
+        if cell is not None:
+            items = self._cells[cell]
+            del items[key]
+            if not items:
+                del self._cells[cell]
+
+    def within(self, position: BasePosition, radius: float) -> List[Tuple[Hashable, float]]:
+        """Objects within `radius` km from the position sorted by haversine
+        distance. Returns a list of (key, distance)"""
+
+        lon, lat = position.coords
+
+        dlat = radius / KM_PER_DEGREE
+        # longitude degrees are shorter closer to the poles
+        max_lat = min(max(abs(lat - dlat), abs(lat + dlat)), 90)
+        lon_scale = cos(radians(max_lat))
+        dlon = 360 if lon_scale < 1e-6 else min(radius / (KM_PER_DEGREE * lon_scale), 360)
+
+        min_x, min_y = self._cell(lon - dlon, lat - dlat)
+        max_x, max_y = self._cell(lon + dlon, lat + dlat)
+
+        keys = []
+        coords = []
+        if (max_x - min_x + 1) * (max_y - min_y + 1) > len(self._cells):
+            # the search area is larger than the number of non empty cells
+            cells = [
+                items
+                for (x, y), items in self._cells.items()
+                if min_x <= x <= max_x and min_y <= y <= max_y
+            ]
+        else:
+            cells = []
+            for x in range(min_x, max_x + 1):
+                for y in range(min_y, max_y + 1):
+                    items = self._cells.get((x, y))
+                    if items:
+                        cells.append(items)
+
+        for items in cells:
+            keys.extend(items.keys())
+            coords.extend(items.values())
+
+        if not keys:
+            return []
+
+        distances = haversine_matrix(np.array([[lon, lat]]), np.array(coords))[0]
+        order = np.argsort(distances, kind="stable")
+        return [(keys[i], distances[i]) for i in order if distances[i] <= radius]
+
+    def nearest(self, position: BasePosition, k: int = 1) -> List[Tuple[Hashable, float]]:
+        """The k closest objects to the position sorted by haversine distance.
+        Returns a list of (key, distance)"""
+
+        radius = self.cell_size
+        while True:
+            found = self.within(position, radius)
+            # if there are k objects within the radius, the k closest objects
+            # are among them
+            if len(found) >= k or len(found) == len(self._keys):
+                return found[:k]
+            radius *= 2
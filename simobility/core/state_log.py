@@ -0,0 +1,467 @@
+import json
+import logging
+import queue
+import threading
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# the same columns as in CSVFileHandler
+STATE_LOG_SCHEMA = pa.schema(
+    [
+        ("clock_time", pa.int64()),
+        ("object_type", pa.string()),
+        ("uuid", pa.string()),
+        ("itinerary_id", pa.string()),
+        ("from_state", pa.string()),
+        ("to_state", pa.string()),
+        ("lon", pa.float64()),
+        ("lat", pa.float64()),
+        ("details", pa.string()),
+    ]
+)
+
+
+def _position(state_info: Dict):
+    """Longitude and latitude of a state change"""
+    if "lon" in state_info:
+        return state_info["lon"], state_info.get("lat")
+
+    position = state_info.get("position")
+    if isinstance(position, dict):
+        return position.get("lon"), position.get("lat")
+    return None, None
+
+
+class ArrowStateLogWriter:
+    """ Writes state changes to an Arrow IPC or Parquet file. State changes
+    are appended to in-memory column buffers and written in large blocks,
+    details are serialized to json only when a block is written.
+
+    The writer is a state change sink, it receives state changes directly
+    from StateMachine without logging:
+
+    >>> writer = ArrowStateLogWriter("simulation.parquet")
+    >>> loggers.add_state_change_sink(writer)
+    >>> simulator.simulate(demand, duration_mins)
+    >>> writer.close()
+    >>> data = read_state_log("simulation.parquet")
+    """
+
+    def __init__(
+        self,
+        file_name: str,
+        file_format: Optional[str] = None,
+        buffer_size: int = 65536,
+        compression: Optional[str] = None,
+    ):
+        """
+        Parameters
+        ----------
+
+        file_name : str
+
+        file_format : str
+            "arrow" or "parquet", by default it is defined by the file extension
+
+        buffer_size : int
+            Number of state changes written at once
+
+        compression : str
+            Compression codec, e.g. "zstd", "lz4" (Arrow) or "snappy" (Parquet)
+        """
+
+        if file_format is None:
+            file_format = "parquet" if file_name.endswith(".parquet") else "arrow"
+
+        if file_format not in ("arrow", "parquet"):
+            raise Exception(f"Unknown file format {file_format}")
+
+        self.file_name = file_name
+        self.file_format = file_format
+        self.buffer_size = buffer_size
+        self.compression = compression
+
+        self._columns = {name: [] for name in STATE_LOG_SCHEMA.names}
+        self._size = 0
+        self._writer = None
+
+    def _open(self):
+        if self.file_format == "parquet":
+            import pyarrow.parquet as pq
+
+            compression = self.compression or "snappy"
+            self._writer = pq.ParquetWriter(
+                self.file_name, STATE_LOG_SCHEMA, compression=compression
+            )
+        else:
+            options = pa.ipc.IpcWriteOptions(compression=self.compression)
+            self._writer = pa.ipc.new_file(
+                self.file_name, STATE_LOG_SCHEMA, options=options
+            )
+
+    def write(self, state_info: Dict):
+        columns = self._columns
+        columns["clock_time"].append(state_info["clock_time"])
+        columns["object_type"].append(state_info["object_type"])
+        columns["uuid"].append(state_info["uuid"])
+        columns["itinerary_id"].append(state_info["itinerary_id"])
+        columns["from_state"].append(state_info["from_state"])
+        columns["to_state"].append(state_info["to_state"])
+
+        lon, lat = _position(state_info)
+        columns["lon"].append(lon)
+        columns["lat"].append(lat)
+
+        columns["details"].append(state_info["details"])
+
+        self._size += 1
+        if self._size >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """Write buffered state changes to the file"""
+        if self._writer is None:
+            self._open()
+
+        if not self._size:
+            return
+
+        columns = self._columns
+        columns["details"] = [
+            json.dumps(d, separators=(",", ":"), default=str) for d in columns["details"]
+        ]
+        batch = pa.RecordBatch.from_pydict(columns, schema=STATE_LOG_SCHEMA)
+        self._writer.write_batch(batch)
+
+        self._columns = {name: [] for name in STATE_LOG_SCHEMA.names}
+        self._size = 0
+
+    def close(self):
+        self.flush()
+        self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+# columns stored as integer codes of categories
+CATEGORICAL_COLUMNS = ("object_type", "uuid", "itinerary_id", "from_state", "to_state")
+# keys of details stored in separate columns by ColumnarLogHandler
+DETAIL_CATEGORIES = ("stop", "pickup", "dropoff", "vid")
+DETAIL_NUMBERS = ("trip_distance", "trip_duration")
+
+
+class ColumnarLogHandler(logging.NullHandler):
+    """ In-memory storage of state changes - an alternative to
+    InMemoryLogHandler that uses much less memory. State changes are stored
+    in growable typed arrays: strings (object types, uuids, states) are stored
+    as integer codes of categories, coordinates as floats.
+
+    Details are stored in columns too:
+    - stop, pickup, dropoff, vid - categories
+    - trip_distance, trip_duration - floats, NaN if missing
+    - positions, e.g. origin - floats `<key>_lon` and `<key>_lat`
+
+    Other keys are rare, they are kept per row and exported as a json column
+    "details" (None for rows without such keys).
+
+    It can be used as a logging handler or as a state change sink:
+
+    >>> logs = ColumnarLogHandler()
+    >>> loggers.get_simobility_logger(logs)
+    >>> # or loggers.add_state_change_sink(logs)
+    >>> simulator.simulate(demand, duration_mins)
+    >>> data = logs.to_pandas()
+    """
+
+    def __init__(self, capacity: int = 1024):
+        super().__init__()
+        self._allocate(capacity)
+
+    def _allocate(self, capacity: int):
+        self.size = 0
+        self.capacity = capacity
+
+        self.clock_time = np.zeros(capacity, dtype=np.int64)
+        self.lon = np.full(capacity, np.nan)
+        self.lat = np.full(capacity, np.nan)
+
+        # {column: codes}, code -1 is None
+        self.codes: Dict[str, np.ndarray] = {}
+        # {column: {value: code}}
+        self.categories: Dict[str, Dict[str, int]] = {}
+        for name in CATEGORICAL_COLUMNS:
+            self._add_codes(name)
+
+        # detail columns with floats, added when a key is found first time
+        self.numbers: Dict[str, np.ndarray] = {}
+        # {row: details that are not stored in columns}
+        self.extra_details: Dict[int, Dict] = {}
+
+    def _add_codes(self, name: str):
+        self.codes[name] = np.full(self.capacity, -1, dtype=np.int32)
+        self.categories[name] = {}
+
+    def _add_numbers(self, name: str):
+        self.numbers[name] = np.full(self.capacity, np.nan)
+
+    def _grow(self):
+        capacity = max(self.capacity * 2, 1)
+
+        def extend(column, fill):
+            extended = np.full(capacity, fill, dtype=column.dtype)
+            extended[: len(column)] = column
+            return extended
+
+        self.clock_time = extend(self.clock_time, 0)
+        self.lon = extend(self.lon, np.nan)
+        self.lat = extend(self.lat, np.nan)
+        self.codes = {name: extend(codes, -1) for name, codes in self.codes.items()}
+        self.numbers = {
+            name: extend(values, np.nan) for name, values in self.numbers.items()
+        }
+        self.capacity = capacity
+
+    def _code(self, name: str, value: str) -> int:
+        categories = self.categories[name]
+        code = categories.get(value)
+        if code is None:
+            code = categories[value] = len(categories)
+        return code
+
+    def _number(self, name: str, idx: int, value: float):
+        values = self.numbers.get(name)
+        if values is None:
+            self._add_numbers(name)
+            values = self.numbers[name]
+        values[idx] = value
+
+    def handle(self, record):
+        self.write(record.msg)
+        super().handle(record)
+
+    def write(self, state_info: Dict):
+        if self.size == self.capacity:
+            self._grow()
+
+        idx = self.size
+        self.clock_time[idx] = state_info["clock_time"]
+
+        for name in CATEGORICAL_COLUMNS:
+            value = state_info[name]
+            if value is not None:
+                self.codes[name][idx] = self._code(name, value)
+
+        lon, lat = _position(state_info)
+        if lon is not None:
+            self.lon[idx] = lon
+        if lat is not None:
+            self.lat[idx] = lat
+
+        extra = None
+        for key, value in state_info["details"].items():
+            if value is None:
+                continue
+
+            if key in DETAIL_CATEGORIES and isinstance(value, str):
+                if key not in self.codes:
+                    self._add_codes(key)
+                self.codes[key][idx] = self._code(key, value)
+            elif key in DETAIL_NUMBERS and isinstance(value, (int, float)):
+                self._number(key, idx, value)
+            elif isinstance(value, dict) and value.keys() == {"lon", "lat"}:
+                self._number(f"{key}_lon", idx, value["lon"])
+                self._number(f"{key}_lat", idx, value["lat"])
+            else:
+                if extra is None:
+                    extra = self.extra_details[idx] = {}
+                extra[key] = value
+
+        self.size += 1
+
+    def clear(self):
+        self._allocate(self.capacity)
+
+    def _extra_details(self) -> List[Optional[str]]:
+        details = [None] * self.size
+        for idx, extra in self.extra_details.items():
+            details[idx] = json.dumps(extra, separators=(",", ":"), default=str)
+        return details
+
+    def to_pandas(self) -> pd.DataFrame:
+        """State changes as a data frame, strings are categorical columns.
+        The data frame can be used by `calculate_metrics`"""
+        n = self.size
+
+        columns = {"clock_time": self.clock_time[:n]}
+        # CATEGORICAL_COLUMNS are the first, followed by details
+        for name in self.codes:
+            columns[name] = pd.Categorical.from_codes(
+                self.codes[name][:n], categories=list(self.categories[name])
+            )
+            if name == CATEGORICAL_COLUMNS[-1]:
+                columns["lon"] = self.lon[:n]
+                columns["lat"] = self.lat[:n]
+        for name, values in self.numbers.items():
+            columns[name] = values[:n]
+        columns["details"] = self._extra_details()
+
+        return pd.DataFrame(columns)
+
+    def to_arrow(self) -> pa.Table:
+        """State changes as an Arrow table with the same columns as
+        `to_pandas`, strings are dictionary arrays"""
+        n = self.size
+
+        columns = {"clock_time": pa.array(self.clock_time[:n])}
+        # CATEGORICAL_COLUMNS are the first, followed by details
+        for name in self.codes:
+            codes = self.codes[name][:n]
+            indices = pa.array(codes, mask=codes < 0)
+            dictionary = pa.array(list(self.categories[name]), type=pa.string())
+            columns[name] = pa.DictionaryArray.from_arrays(indices, dictionary)
+            if name == CATEGORICAL_COLUMNS[-1]:
+                columns["lon"] = pa.array(self.lon[:n])
+                columns["lat"] = pa.array(self.lat[:n])
+        for name, values in self.numbers.items():
+            columns[name] = pa.array(values[:n])
+        columns["details"] = pa.array(self._extra_details(), type=pa.string())
+
+        return pa.Table.from_arrays(list(columns.values()), names=list(columns))
+
+
+# commands for the background thread
+_FLUSH = object()
+_STOP = object()
+
+
+class BackgroundStateLogWriter:
+    """ Runs a state change sink in a background thread, so serialization,
+    compression and disk I/O do not block a simulation.
+
+    State changes are collected into chunks and passed to the thread through
+    a bounded queue. If the writer can't keep up with a simulation, the queue
+    gets full and the simulation waits (back-pressure), so memory usage
+    stays bounded.
+
+    >>> writer = BackgroundStateLogWriter(ArrowStateLogWriter("logs.parquet"))
+    >>> loggers.add_state_change_sink(writer)
+    >>> simulator.simulate(demand, duration_mins)  # flushes the writer
+    >>> writer.close()
+
+    The same works for CSV files:
+
+    >>> handler = loggers.CSVFileHandler("logs.csv", "w")
+    >>> writer = BackgroundStateLogWriter(loggers.LogHandlerSink(handler))
+    """
+
+    def __init__(self, sink, chunk_size: int = 1024, max_chunks: int = 64):
+        """
+        Parameters
+        ----------
+
+        sink : object
+            State change sink, e.g. ArrowStateLogWriter
+
+        chunk_size : int
+            Number of state changes passed to the thread at once
+
+        max_chunks : int
+            Max number of chunks waiting to be written
+        """
+        self.sink = sink
+        self.chunk_size = chunk_size
+
+        self._chunk: List[Dict] = []
+        self._queue: queue.Queue = queue.Queue(maxsize=max_chunks)
+        self._error: Optional[Exception] = None
+
+        self._thread = threading.Thread(
+            target=self._run, name="simobility-log-writer", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+
+                # skip everything after the first error
+                if self._error is not None:
+                    continue
+
+                if item is _FLUSH:
+                    self.sink.flush()
+                else:
+                    for state_info in item:
+                        self.sink.write(state_info)
+
+            except Exception as e:
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _check_error(self):
+        if self._error is not None:
+            raise Exception("Failed to write state changes") from self._error
+
+    def _put(self, item):
+        if not self._thread.is_alive():
+            raise Exception("Writer is closed")
+        # blocks if the queue is full
+        self._queue.put(item)
+
+    def write(self, state_info: Dict):
+        self._chunk.append(state_info)
+        if len(self._chunk) >= self.chunk_size:
+            self._check_error()
+            chunk, self._chunk = self._chunk, []
+            self._put(chunk)
+
+    def flush(self):
+        """Wait until all state changes are written by the sink"""
+        if self._chunk:
+            chunk, self._chunk = self._chunk, []
+            self._put(chunk)
+
+        self._put(_FLUSH)
+        self._queue.join()
+        self._check_error()
+
+    def close(self):
+        if not self._thread.is_alive():
+            return
+
+        try:
+            self.flush()
+        finally:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self.sink.close()
+
+
+def read_state_log(file_name: str, parse_details: bool = True) -> pd.DataFrame:
+    """ Read state changes written by ArrowStateLogWriter. If parse_details
+    is True, details are converted from json to dicts, so the data can be
+    used by `calculate_metrics`
+    """
+
+    if file_name.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(file_name)
+    else:
+        with pa.memory_map(file_name) as source:
+            table = pa.ipc.open_file(source).read_all()
+
+    data = table.to_pandas()
+    if parse_details:
+        data["details"] = [json.loads(d) for d in data["details"]]
+    return data
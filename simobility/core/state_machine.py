@@ -1,11 +1,155 @@
 from enum import Enum
-from typing import List, Dict
+from typing import List, Dict, Tuple, Optional
 from collections import OrderedDict
-from transitions import Machine
-from transitions.core import EventData
 from uuid import uuid4
 from .clock import Clock
-from .loggers import get_simobility_logger
+from .loggers import get_simobility_logger, state_change_sinks
+
+
+class MachineError(Exception):
+    """Raised when a trigger is called in a state that has no transition
+    defined for it"""
+
+
+class Transition:
+    """Source and destination state names of a transition. Instances are
+    shared by all objects of the same class"""
+
+    __slots__ = ("source", "dest")
+
+    def __init__(self, source: str, dest: str):
+        self.source = source
+        self.dest = dest
+
+
+class StateChange:
+    """Describes a state change and is passed to `on_state_changed`:
+
+    - transition.source and transition.dest - state names
+    - kwargs - keyword arguments of the trigger call
+    """
+
+    __slots__ = ("transition", "kwargs")
+
+    def __init__(self, transition: Transition, kwargs: Dict):
+        self.transition = transition
+        self.kwargs = kwargs
+
+
+class TransitionTable:
+    """State transitions compiled to integer state codes. A table is built
+    once per class of a state machine and shared by all its instances.
+
+    For each trigger the table keeps a tuple indexed by a source state code,
+    the value is a shared `Transition` or None if the trigger is not allowed
+    in the state
+    """
+
+    def __init__(self, transitions: List[List[object]], states: List[Enum]):
+        # keep the original definition to detect if it has changed
+        self.definition = transitions
+        self.states: Tuple[Enum, ...] = tuple(states)
+        self.codes: Dict[Enum, int] = {s: i for i, s in enumerate(self.states)}
+
+        names = [s.name for s in self.states]
+        self.name_codes: Dict[str, int] = {name: i for i, name in enumerate(names)}
+        # shared transition objects, one for each pair of source and destination
+        edges: Dict[Tuple[int, int], Transition] = {}
+
+        rows: Dict[str, List[Optional[Tuple[int, Transition]]]] = {}
+        for trigger, source, dest in transitions:
+            sources = source if isinstance(source, (list, tuple)) else [source]
+            row = rows.setdefault(trigger, [None] * len(self.states))
+            dest_code = self.codes[dest]
+
+            for src in sources:
+                src_code = self.codes[src]
+                key = (src_code, dest_code)
+                if key not in edges:
+                    edges[key] = Transition(names[src_code], names[dest_code])
+                row[src_code] = (dest_code, edges[key])
+
+        self.triggers: Dict[str, Tuple[Optional[Tuple[int, Transition]], ...]] = {
+            trigger: tuple(row) for trigger, row in rows.items()
+        }
+
+
+def _make_trigger(trigger: str):
+    def set_state(self, **kwargs) -> bool:
+        return self._trigger(trigger, kwargs)
+
+    set_state.__name__ = trigger
+    set_state._generated = True
+    return set_state
+
+
+def _make_checker(name: str, state: str):
+    def is_state(self) -> bool:
+        return self._state == self._transition_table.name_codes.get(state)
+
+    is_state.__name__ = name
+    is_state._generated = True
+    return is_state
+
+
+def _install(cls, name: str, func):
+    """Add method to the class unless the name is taken by a user defined
+    attribute, e.g. Vehicle.is_moving"""
+    current = getattr(cls, name, None)
+    if current is None or getattr(current, "_generated", False):
+        setattr(cls, name, func)
+
+
+# compiled tables {(class, transitions, states): table}
+_tables: Dict[Tuple, TransitionTable] = {}
+# {class: (transitions, states, table)} - the last used lists, allows to skip
+# building a key when the same lists are passed to each instance
+_last_tables: Dict[type, Tuple[List, List, TransitionTable]] = {}
+
+
+def _definition_key(transitions: List[List[object]], states: List[Enum]) -> Tuple:
+    return (
+        tuple(
+            (trigger, tuple(source) if isinstance(source, (list, tuple)) else source, dest)
+            for trigger, source, dest in transitions
+        ),
+        tuple(states),
+    )
+
+
+def compile_transitions(
+    cls, transitions: List[List[object]], states: List[Enum]
+) -> TransitionTable:
+    """Build a transition table for the class and add `set_<trigger>` and
+    `is_<state>` methods to it. Tables are cached, so instances with the
+    same transitions share a table.
+
+    Generated methods are not added to StateMachine itself, they are
+    resolved by `StateMachine.__getattr__`"""
+
+    entry = _last_tables.get(cls)
+    if entry is not None and entry[0] is transitions and entry[1] is states:
+        return entry[2]
+
+    key = (cls, *_definition_key(transitions, states))
+    table = _tables.get(key)
+    if table is None:
+        table = _tables[key] = TransitionTable(transitions, states)
+
+        if cls is not StateMachine:
+            for trigger in table.triggers:
+                _install(cls, trigger, _make_trigger(trigger))
+
+            for state in table.states:
+                name = f"is_{state.name}"
+                _install(cls, name, _make_checker(name, state.name))
+
+            # the default table of the class, e.g. Vehicle._transition_table
+            if "_transition_table" not in cls.__dict__:
+                cls._transition_table = table
+
+    _last_tables[cls] = (transitions, states, table)
+    return table
 
 
 class StateMachine:
@@ -13,11 +157,13 @@ class StateMachine:
     """ Basic class for all classes with multiple states, e.g. Booking, Vehicle.
 
     The main responcibility of this class is to log all state transitions.
-    When state is changes `_state_machine` calls method `on_state_changed`.
+    When state is changes a trigger calls method `on_state_changed`.
 
     All chagnes are loged by `logger`
     """
 
+    _transition_table: Optional[TransitionTable] = None
+
     def __init__(
         self,
         clock: Clock,
@@ -35,7 +181,8 @@ class StateMachine:
             Simulated clock
 
         transitions : list
-            List of state transitions, e.g. "idling" to "moving_to"
+            List of state transitions, e.g. "idling" to "moving_to". Transitions
+            are compiled once per class, the first time an instance is created
 
         states : List[Enum]
             List of state names, e.g. "idling", "moving_to"
@@ -45,7 +192,7 @@ class StateMachine:
 
         object_id : str
             A unique id of an object
-            
+
         """
         self.id = object_id
         if self.id is None:
@@ -53,18 +200,46 @@ class StateMachine:
         self.clock = clock
         self.created_at = clock.now
 
-        self._state_machine = Machine(
-            model=self,
-            states=states,
-            transitions=transitions,
-            initial=initial_state,
-            send_event=True,
-            after_state_change="on_state_changed",
-        )
+        table = compile_transitions(type(self), transitions, states)
+        # each instance keeps its own table: instances of the same class
+        # can be created with different transitions
+        self._transition_table = table
+        self._state: int = table.codes[initial_state]
 
         self.logger = get_simobility_logger()
 
-    def on_state_changed(self, event: EventData) -> Dict:
+    def __getattr__(self, name: str):
+        # generated methods of objects created directly from StateMachine
+        table = self.__dict__.get("_transition_table")
+        if table is not None:
+            if name in table.triggers:
+                return _make_trigger(name).__get__(self)
+            if name.startswith("is_") and name[3:] in table.name_codes:
+                return _make_checker(name, name[3:]).__get__(self)
+        raise AttributeError(
+            f"'{type(self).__name__}' object has no attribute '{name}'"
+        )
+
+    @property
+    def state(self) -> Enum:
+        return self._transition_table.states[self._state]
+
+    def _trigger(self, trigger: str, kwargs: Dict) -> bool:
+        row = self._transition_table.triggers.get(trigger)
+        if row is None:
+            raise AttributeError(f"Trigger {trigger} is not defined")
+
+        target = row[self._state]
+        if target is None:
+            raise MachineError(
+                f"Can't trigger event {trigger} from state {self.state.name}"
+            )
+
+        self._state, transition = target
+        self.on_state_changed(StateChange(transition, kwargs))
+        return True
+
+    def on_state_changed(self, event: StateChange) -> Dict:
         """Called on each state transition"""
 
         state_info = self.process_state_change(event)
@@ -72,12 +247,15 @@ class StateMachine:
         # Check Booking.on_state_changed and Vehicle.on_state_changed for details
         # msg = self.format_message(state_info)
 
+        for sink in state_change_sinks:
+            sink.write(state_info)
+
         # Log state changes - results of simulations
         self.logger.info(state_info)
 
         return state_info
 
-    def process_state_change(self, event: EventData) -> OrderedDict:
+    def process_state_change(self, event: StateChange) -> OrderedDict:
         # Arguments specific to each class and state change
         # They defined in derived classes
         arguments = event.kwargs.copy()
@@ -1,4 +1,6 @@
 import logging
+import bisect
+from typing import Optional, Tuple
 import pandas as pd
 import numpy as np
 from datetime import datetime
@@ -9,6 +11,7 @@ from .itinerary import Itinerary
 from .vehicle import Vehicle
 from .booking import Booking
 from .geo_position import GeographicPosition
+from ..routers.utils import haversine_distances, positions_to_array
 
 
 def basic_booking_itinerary(
@@ -30,6 +33,101 @@ def basic_booking_itinerary(
     return itinerary
 
 
+def map_match_trips(pickups: np.ndarray, dropoffs: np.ndarray, map_matcher):
+    """Map match arrays of pickups and dropoffs of shape (n, 2) with a single
+    `map_match_many` call"""
+    coords = np.vstack([pickups, dropoffs]).tolist()
+    positions = [GeographicPosition(*c) for c in coords]
+    matched = positions_to_array(map_matcher.map_match_many(positions))
+    return matched[: len(pickups)], matched[len(pickups):]
+
+
+def filter_trips(
+    pickups: np.ndarray,
+    dropoffs: np.ndarray,
+    matched_pickups: Optional[np.ndarray] = None,
+    matched_dropoffs: Optional[np.ndarray] = None,
+    max_match_distance: float = 0.05,
+    min_trip_distance: float = 0.1,
+) -> np.ndarray:
+    """ The same filters as in ReplayDemand.next for whole arrays of trips:
+    - map matched pickup or dropoff is too far from the original one
+    - pickup and dropoff are too close to each other
+
+    Parameters
+    ----------
+
+    pickups, dropoffs : np.array
+        Arrays of shape (n, 2) with lon/lat coordinates
+
+    matched_pickups, matched_dropoffs : np.array
+        Map matched pickups and dropoffs, if None trips are not
+        filtered by map matching distance
+
+    max_match_distance : float
+        Max distance in km between original and map matched positions
+
+    min_trip_distance : float
+        Min distance in km between pickup and dropoff
+
+    Returns
+    -------
+
+    mask : np.array
+        Boolean array, True for trips that pass all filters
+    """
+
+    mask = np.ones(len(pickups), dtype=bool)
+
+    if matched_pickups is not None:
+        pu_distance = haversine_distances(pickups, matched_pickups)
+        do_distance = haversine_distances(dropoffs, matched_dropoffs)
+        mask &= (pu_distance <= max_match_distance) & (do_distance <= max_match_distance)
+
+        num_skipped = np.count_nonzero(~mask)
+        if num_skipped:
+            logging.warning(
+                f"{num_skipped} map matched pickups or dropoffs are too far "
+                "from the original"
+            )
+
+        pickups, dropoffs = matched_pickups, matched_dropoffs
+
+    mask &= haversine_distances(pickups, dropoffs) >= min_trip_distance
+    return mask
+
+
+def prepare_trips(pickups: np.ndarray, dropoffs: np.ndarray, map_matcher=None):
+    """ Map match pickups and dropoffs (if map_matcher is set) and filter
+    trips with `filter_trips`
+
+    Returns
+    -------
+
+    pickups, dropoffs : np.array
+        Map matched pickups and dropoffs of trips that passed filters
+
+    mask : np.array
+        Boolean array, True for trips that passed filters
+    """
+
+    # the same rounding as in GeographicPosition
+    pickups = np.round(pickups, 6)
+    dropoffs = np.round(dropoffs, 6)
+
+    matched_pickups = matched_dropoffs = None
+    if map_matcher:
+        matched_pickups, matched_dropoffs = map_match_trips(
+            pickups, dropoffs, map_matcher
+        )
+
+    mask = filter_trips(pickups, dropoffs, matched_pickups, matched_dropoffs)
+    if matched_pickups is not None:
+        pickups, dropoffs = matched_pickups, matched_dropoffs
+
+    return pickups[mask], dropoffs[mask], mask
+
+
 class ReplayDemand:
     def __init__(
         self,
@@ -41,6 +139,7 @@ class ReplayDemand:
         sample_size: int = None,
         map_matcher=None,
         seed=None,
+        map_match_ahead: bool = False,
     ):
         """
         Expected columns:
@@ -49,6 +148,10 @@ class ReplayDemand:
         - pickup_lat
         - dropoff_lon
         - dropoff_lat
+
+        Pickups and dropoffs of each demand batch are map matched at once
+        with `map_matcher.map_match_many`. If `map_match_ahead` is True, all
+        positions are map matched when the demand is created
         """
 
         self.clock = clock
@@ -87,6 +190,70 @@ class ReplayDemand:
         }
         self.map_matcher = map_matcher
 
+        # {batch: (pickups, dropoffs, matched pickups, matched dropoffs)}
+        self._positions = {}
+        if map_matcher and map_match_ahead:
+            self._map_match_all()
+
+        # clock times of demand batches, only batches that fall exactly on
+        # a clock step are replayed
+        start = pd.to_datetime(self.clock.to_datetime(0))
+        step = self.clock.clock_time_to_seconds(1)
+        times = [(k - start).total_seconds() / step for k in self.demand]
+        self._times = sorted(int(t) for t in times if t == int(t))
+
+    def next_event_time(self) -> Optional[int]:
+        """Clock time of the next demand batch after the current clock time"""
+        idx = bisect.bisect_right(self._times, self.clock.now)
+        if idx < len(self._times):
+            return self._times[idx]
+        return None
+
+    @staticmethod
+    def _batch_positions(trips: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """Arrays of pickups and dropoffs of shape (n, 2)"""
+        # the same rounding as in GeographicPosition
+        pickups = np.round(trips[["pickup_lon", "pickup_lat"]].to_numpy(float), 6)
+        dropoffs = np.round(trips[["dropoff_lon", "dropoff_lat"]].to_numpy(float), 6)
+        return pickups, dropoffs
+
+    def _map_match_all(self):
+        """Map match positions of all demand batches in a single call"""
+        positions = {
+            key: self._batch_positions(trips) for key, trips in self.demand.items()
+        }
+
+        if not positions:
+            return
+
+        pickups = np.concatenate([pu for pu, _ in positions.values()])
+        dropoffs = np.concatenate([do for _, do in positions.values()])
+        matched_pu, matched_do = map_match_trips(pickups, dropoffs, self.map_matcher)
+
+        offset = 0
+        for key, (pickups, dropoffs) in positions.items():
+            n = len(pickups)
+            self._positions[key] = (
+                pickups,
+                dropoffs,
+                matched_pu[offset: offset + n],
+                matched_do[offset: offset + n],
+            )
+            offset += n
+
+    def _get_positions(self, key) -> Tuple[np.ndarray, ...]:
+        """Original and map matched pickups and dropoffs of a demand batch.
+        Map matched positions are None if there is no map matcher"""
+        if key in self._positions:
+            return self._positions.pop(key)
+
+        pickups, dropoffs = self._batch_positions(self.demand[key])
+        if not self.map_matcher:
+            return pickups, dropoffs, None, None
+
+        matched_pu, matched_do = map_match_trips(pickups, dropoffs, self.map_matcher)
+        return pickups, dropoffs, matched_pu, matched_do
+
     def next(self, key=None):
         if key is None:
             key = pd.to_datetime(self.clock.to_datetime())
@@ -95,35 +262,15 @@ class ReplayDemand:
         seats = 1
 
         if key in self.demand:
-            for b in self.demand[key].itertuples():
-                pu = GeographicPosition(b.pickup_lon, b.pickup_lat)
-                do = GeographicPosition(b.dropoff_lon, b.dropoff_lat)
-
-                if self.map_matcher:
-                    original_pu = pu
-                    original_do = do
-                    pu = self.map_matcher.map_match(pu)
-
-                    if pu.distance(original_pu) > 0.05:
-                        logging.warning(
-                            f"Map matched pickup is {pu.distance(original_pu)} away for the original"
-                        )
-                        # skip booking
-                        continue
-
-                    do = self.map_matcher.map_match(do)
-                    if do.distance(original_do) > 0.05:
-                        logging.warning(
-                            f"Map matched dropoff is {do.distance(original_do)} away for the original"
-                        )
-                        # skip booking
-                        continue
-
-                # TODO: move distance thresholds to config
-                if pu.distance(do) < 0.1:
-                    # logging.warning(f"Pickup and dropoff are too close to each other {pu.distance(do)}")
-                    continue
-
-                bookings.append(Booking(self.clock, pu, do, seats))
+            pickups, dropoffs, matched_pu, matched_do = self._get_positions(key)
+
+            # TODO: move distance thresholds to config
+            mask = filter_trips(pickups, dropoffs, matched_pu, matched_do)
+            if matched_pu is not None:
+                pickups, dropoffs = matched_pu, matched_do
+
+            bookings = Booking.create_many(
+                self.clock, pickups[mask], dropoffs[mask], seats
+            )
 
         return bookings
@@ -1,8 +1,7 @@
 from enum import Enum
-from typing import Dict, Optional
+from typing import Callable, Dict, Optional
 import logging
-from transitions.core import EventData
-from .state_machine import StateMachine
+from .state_machine import StateMachine, StateChange
 from .base_position import BasePosition
 from .vehicle_engine import VehicleEngine
 
@@ -62,6 +61,9 @@ class Vehicle(StateMachine):
 
         self.context: Dict = {}
 
+        # called after each state change, see Fleet
+        self.state_listener: Optional[Callable[["Vehicle"], None]] = None
+
     @property
     def position(self) -> Optional[BasePosition]:
         """Current position of the vehicle. Returns None if engine is not installed
@@ -139,7 +141,7 @@ class Vehicle(StateMachine):
         self.engine = engine
         self.set_idling(**self.context)
 
-    def on_state_changed(self, event: EventData):
+    def on_state_changed(self, event: StateChange):
         """Called on each state change"""
 
         # TODO: check if kwargs already have keys
@@ -170,3 +172,6 @@ class Vehicle(StateMachine):
                 event.kwargs["dropoff"] = next_job.booking.id
 
         super().on_state_changed(event)
+
+        if self.state_listener:
+            self.state_listener(self)
@@ -1,5 +1,6 @@
 from .linear_router import LinearRouter
 from .osrm_router import OSRMRouter
 from .route import Route
+from .linear_route import LinearRoute
 from .base_route import BaseRoute
 from .caching_router import CachingRouter
\ No newline at end of file
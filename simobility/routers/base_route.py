@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import List, Iterable
 from math import ceil
 from ..core.base_position import BasePosition
 
@@ -70,3 +70,7 @@ class BaseRoute(ABC):
         """Distance traveled from the original position to an approximate
         position of a cetrain point of time"""
         pass
+
+    def approximate_positions(self, times: Iterable[int]) -> List[BasePosition]:
+        """Approximated positions of a vehicle at multiple points of time"""
+        return [self.approximate_position(t) for t in times]
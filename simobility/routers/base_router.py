@@ -30,6 +30,12 @@ class BaseRouter(ABC):
         to a road network"""
         pass
 
+    def map_match_many(self, positions: List[BasePosition]) -> List[BasePosition]:
+        """Map match multiple positions. The default implementation calls
+        `map_match` for each position, routers that work with remote services
+        can match positions concurrently (see OSRMRouter)"""
+        return [self.map_match(p) for p in positions]
+
     @abstractmethod
     def calculate_route(self, origin: BasePosition, destination: BasePosition) -> BaseRoute:
         """Calculate route between 2 points"""
@@ -49,6 +55,10 @@ class BaseRouter(ABC):
         """Calculate all-to-all travel time - all source to all destinations.
         Here distance means "distance in time"
 
+        The default implementation calls `estimate_duration` for each pair,
+        routers that work with coordinates can calculate the whole matrix
+        at once (see LinearRouter)
+
         Parameters
         ----------
 
@@ -0,0 +1,250 @@
+import sys
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+_MISSING = object()
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate memory size of a cached value in bytes. Sizes of lists
+    and attributes of objects (e.g. route coordinates) are counted one
+    level deep"""
+
+    size = sys.getsizeof(value)
+
+    items = None
+    if isinstance(value, (list, tuple)):
+        items = value
+    elif hasattr(value, "__dict__"):
+        items = vars(value).values()
+        size += sys.getsizeof(vars(value))
+
+    if items is not None:
+        for item in items:
+            size += sys.getsizeof(item)
+            if isinstance(item, list) and item:
+                # e.g. route coordinates - assume all items have the same size
+                size += sys.getsizeof(item[0]) * len(item)
+
+    return size
+
+
+class LRUCache:
+    """ Dictionary-like cache with limited size. When the cache is full the
+    least recently used items are evicted.
+
+    The size can be limited by number of items and by approximate memory
+    usage. Items can also expire after `ttl` units of time, e.g. when travel
+    time depends on time of day.
+
+    Statistics of the cache usage - number of hits, misses, evictions and
+    expirations are available in `stats`
+    """
+
+    def __init__(
+        self,
+        maxsize: Optional[int] = 10240,
+        maxbytes: Optional[int] = None,
+        ttl: Optional[int] = None,
+        timer: Optional[Callable[[], int]] = None,
+        sizeof: Callable[[Any], int] = estimate_size,
+    ):
+        """
+        Parameters
+        ----------
+
+        maxsize : int
+            Max number of items, unlimited if None
+
+        maxbytes : int
+            Max approximate memory size of all items, unlimited if None
+
+        ttl : int
+            Time to live of an item, items never expire if None
+
+        timer : callable
+            Function that returns current time, e.g. clock time of a simulation.
+            Required if `ttl` is set
+
+        sizeof : callable
+            Function that estimates memory size of an item. Used only when
+            `maxbytes` is set
+        """
+
+        if ttl is not None and timer is None:
+            raise Exception("Cache with ttl requires a timer")
+
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.ttl = ttl
+        self.timer = timer
+        self.sizeof = sizeof
+
+        # {key: (value, expiration time, size)}
+        self._data: Dict[Hashable, tuple] = OrderedDict()
+        self.nbytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "size": len(self),
+            "bytes": self.nbytes,
+        }
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _expired(self, expires_at: Optional[int]) -> bool:
+        return expires_at is not None and self.timer() >= expires_at
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Check if the key is in the cache without updating statistics
+        and usage of the item"""
+        entry = self._data.get(key)
+        return entry is not None and not self._expired(entry[1])
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+
+        if entry is None:
+            self.misses += 1
+            return default
+
+        value, expires_at, _ = entry
+        if self._expired(expires_at):
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        self._touch(key)
+        return value
+
+    def get_many(self, keys: List[Hashable], default: Any = None) -> List[Any]:
+        return [self.get(key, default) for key in keys]
+
+    def __getitem__(self, key: Hashable) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def put_many(self, items: Iterable[Tuple[Hashable, Any]]):
+        for key, value in items:
+            self[key] = value
+
+    def __setitem__(self, key: Hashable, value: Any):
+        if key in self._data:
+            self._remove(key)
+
+        expires_at = None
+        if self.ttl is not None:
+            expires_at = self.timer() + self.ttl
+
+        size = self.sizeof(value) if self.maxbytes is not None else 0
+        if self.maxbytes is not None and size > self.maxbytes:
+            # the item is too large to be cached
+            return
+
+        # make room for the new item
+        while self._data and self._is_full(size):
+            self._remove(self._victim())
+            self.evictions += 1
+
+        self._data[key] = (value, expires_at, size)
+        self.nbytes += size
+        self._insert(key)
+
+    def __delitem__(self, key: Hashable):
+        if key not in self._data:
+            raise KeyError(key)
+        self._remove(key)
+
+    def clear(self):
+        for key in list(self._data):
+            self._remove(key)
+
+    def _is_full(self, size: int) -> bool:
+        """Check if there is no room for a new item of the size"""
+        if self.maxsize is not None and len(self._data) >= self.maxsize:
+            return True
+        return self.maxbytes is not None and self.nbytes + size > self.maxbytes
+
+    def _remove(self, key: Hashable):
+        _, _, size = self._data.pop(key)
+        self.nbytes -= size
+
+    def _insert(self, key: Hashable):
+        """Called when a new item is added"""
+        pass
+
+    def _touch(self, key: Hashable):
+        """Called when an item is used"""
+        self._data.move_to_end(key)
+
+    def _victim(self) -> Hashable:
+        """Key of the item that will be evicted"""
+        return next(iter(self._data))
+
+
+class LFUCache(LRUCache):
+    """ Cache that evicts the least frequently used items first, the least
+    recently used items are evicted among items with the same frequency
+    """
+
+    def __init__(self, *args, **kwargs):
+        # {key: number of uses}
+        self._frequency: Dict[Hashable, int] = {}
+        # {number of uses: keys ordered by last use}
+        self._buckets: Dict[int, OrderedDict] = {}
+        self._min_frequency = 0
+
+        super().__init__(*args, **kwargs)
+
+    def _insert(self, key: Hashable):
+        self._frequency[key] = 1
+        self._buckets.setdefault(1, OrderedDict())[key] = None
+        self._min_frequency = 1
+
+    def _touch(self, key: Hashable):
+        frequency = self._frequency[key]
+        self._discard(key, frequency)
+
+        self._frequency[key] = frequency + 1
+        self._buckets.setdefault(frequency + 1, OrderedDict())[key] = None
+
+    def _discard(self, key: Hashable, frequency: int):
+        bucket = self._buckets[frequency]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[frequency]
+
+    def _remove(self, key: Hashable):
+        super()._remove(key)
+        self._discard(key, self._frequency.pop(key))
+
+    def _victim(self) -> Hashable:
+        # min frequency can be outdated after items were used or removed
+        while self._min_frequency not in self._buckets:
+            self._min_frequency += 1
+        return next(iter(self._buckets[self._min_frequency]))
+
+
+CACHE_POLICIES = {"lru": LRUCache, "lfu": LFUCache}
+
+
+def create_cache(policy: str = "lru", **kwargs) -> LRUCache:
+    """Create a cache with eviction policy "lru" or "lfu" """
+    if policy not in CACHE_POLICIES:
+        raise Exception(f"Unknown cache policy {policy}")
+    return CACHE_POLICIES[policy](**kwargs)
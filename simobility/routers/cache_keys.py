@@ -0,0 +1,153 @@
+from math import cos, floor, radians, sqrt
+from typing import Callable, Hashable, Optional, Tuple
+from haversine import haversine
+from ..core.base_position import BasePosition
+from ..core.spatial_index import KM_PER_DEGREE
+
+_GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+class ExactKey:
+    """ Cache positions by exact coordinates """
+
+    max_error = 0.0
+
+    def __call__(self, position: BasePosition) -> Hashable:
+        return position.coords
+
+    def center(self, key: Hashable) -> Tuple[float, float]:
+        return key
+
+    def error(self, position: BasePosition) -> float:
+        """Distance in km between the position and a representative point
+        of its key"""
+        return haversine(position.coords[::-1], self.center(self(position))[::-1])
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}()"
+
+
+class GridKey(ExactKey):
+    """ Snap positions to cells of a grid with approximately square cells.
+    All positions in a cell share cache entries, so the error is bounded
+    by a half of the cell diagonal (see `max_error`)
+    """
+
+    def __init__(self, cell_size: float = 50):
+        """
+        Parameters
+        ----------
+
+        cell_size : float
+            Size of a cell side in meters
+        """
+        self.cell_size = cell_size
+        self._lat_deg = cell_size / 1000 / KM_PER_DEGREE
+        # max distance to the cell center in km
+        self.max_error = cell_size * sqrt(2) / 2 / 1000
+
+    def _lon_deg(self, row: int) -> float:
+        # longitude degrees are shorter closer to the poles
+        lat = (row + 0.5) * self._lat_deg
+        return self._lat_deg / max(cos(radians(lat)), 1e-6)
+
+    def __call__(self, position: BasePosition) -> Hashable:
+        lon, lat = position.coords
+        row = floor(lat / self._lat_deg)
+        return (floor(lon / self._lon_deg(row)), row)
+
+    def center(self, key: Hashable) -> Tuple[float, float]:
+        col, row = key
+        return ((col + 0.5) * self._lon_deg(row), (row + 0.5) * self._lat_deg)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.cell_size})"
+
+
+class GeohashKey(ExactKey):
+    """ Snap positions to geohash cells of a given precision. Precision 7
+    gives cells of about 150 x 150 meters, precision 8 - 38 x 19 meters
+    """
+
+    def __init__(self, precision: int = 7):
+        self.precision = precision
+
+        # number of bits of longitude and latitude
+        lon_bits = (precision * 5 + 1) // 2
+        lat_bits = precision * 5 // 2
+        lon_err = 180 / 2 ** lon_bits
+        lat_err = 90 / 2 ** lat_bits
+        # the worst case is at the equator
+        self.max_error = haversine((0, 0), (lat_err, lon_err))
+
+    def __call__(self, position: BasePosition) -> Hashable:
+        lon, lat = position.coords
+        lon_range = [-180.0, 180.0]
+        lat_range = [-90.0, 90.0]
+
+        chars = []
+        bits = 0
+        n_bits = 0
+        even = True
+        while len(chars) < self.precision:
+            value, rng = (lon, lon_range) if even else (lat, lat_range)
+            mid = (rng[0] + rng[1]) / 2
+            if value >= mid:
+                bits = bits * 2 + 1
+                rng[0] = mid
+            else:
+                bits = bits * 2
+                rng[1] = mid
+
+            even = not even
+            n_bits += 1
+            if n_bits == 5:
+                chars.append(_GEOHASH_ALPHABET[bits])
+                bits = 0
+                n_bits = 0
+
+        return "".join(chars)
+
+    def center(self, key: Hashable) -> Tuple[float, float]:
+        lon_range = [-180.0, 180.0]
+        lat_range = [-90.0, 90.0]
+
+        even = True
+        for char in key:
+            code = _GEOHASH_ALPHABET.index(char)
+            for shift in range(4, -1, -1):
+                rng = lon_range if even else lat_range
+                mid = (rng[0] + rng[1]) / 2
+                if (code >> shift) & 1:
+                    rng[0] = mid
+                else:
+                    rng[1] = mid
+                even = not even
+
+        return (sum(lon_range) / 2, sum(lat_range) / 2)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.precision})"
+
+
+class MapMatchKey(ExactKey):
+    """ Snap positions to the closest point of a road network. Positions
+    matched to the same point share cache entries. The error is not bounded,
+    it depends on the distance to the road network
+    """
+
+    max_error = float("inf")
+
+    def __init__(self, map_match: Optional[Callable[[BasePosition], BasePosition]] = None):
+        """
+        Parameters
+        ----------
+
+        map_match : callable
+            Map matching function, e.g. `OSRMRouter.map_match`. If None,
+            CachingRouter uses its own cached map matching
+        """
+        self.map_match = map_match
+
+    def __call__(self, position: BasePosition) -> Hashable:
+        return self.map_match(position).coords
@@ -1,9 +1,14 @@
+import copy
+import hashlib
 import numpy as np
-from typing import List, Dict, Tuple
-from collections import OrderedDict
+from typing import List, Dict, Tuple, Optional
 from .base_router import BaseRouter
 from ..core.base_position import BasePosition
 from .route import Route
+from .linear_route import LinearRoute
+from .cache import LRUCache, create_cache
+from .cache_keys import ExactKey, MapMatchKey
+from .disk_cache import SQLiteStore, PersistentCache, router_identity
 
 
 class CachingRouter:
@@ -12,36 +17,179 @@ class CachingRouter:
     - routes calculate
     - ETAs
     - distance matrix
+
+    Each type of requests has a separate cache, see `cache_stats` for
+    the number of hits and misses of each cache.
+
+    Distance matrices are cached by rows: an item is a source with arrays
+    of destinations (hashes of their keys) and durations, so `maxsize` of
+    the matrix cache is the number of sources. For large matrices use
+    `maxbytes` to limit memory
     """
 
-    # TODO: add cache expiration time
-    def __init__(self, router: BaseRouter):
+    # max number of requests made by calculate_distance_matrix
+    max_matrix_blocks = 4
+
+    def __init__(
+        self,
+        router: BaseRouter,
+        maxsize: Optional[int] = 10240,
+        maxbytes: Optional[int] = None,
+        ttl: Optional[int] = None,
+        policy: str = "lru",
+        path: Optional[str] = None,
+        router_id: Optional[str] = None,
+        key: Optional[ExactKey] = None,
+    ):
+        """
+        Parameters
+        ----------
+
+        router : BaseRouter
+            Router that calculates missing items
+
+        maxsize : int
+            Max number of items in each cache, unlimited if None
+
+        maxbytes : int
+            Approximate max memory size of each cache in bytes, unlimited if None
+
+        ttl : int
+            Time in clock units after which cached items expire, e.g. when
+            travel times depend on time of day. Items never expire if None
+
+        policy : str
+            Eviction policy: "lru" - least recently used or "lfu" - least
+            frequently used
+
+        path : str
+            Path to a SQLite file with a persistent cache shared by multiple
+            simulation runs. If None, items are cached only in memory.
+            Items in the file never expire
+
+        router_id : str
+            Identity of the router in the persistent cache, by default it is
+            built from the router class, its parameters and clock units
+
+        key : ExactKey
+            Converts origins and destinations of routes and durations to cache
+            keys. By default exact coordinates are used. `GridKey` and
+            `GeohashKey` allow close positions to share cached items with
+            the error bounded by `key.max_error`. Note that geometry of
+            cached routes is the geometry of the first request
+        """
         self.__router = router
-        self.__routes: Dict[Tuple, Route] = FixedSizeCache()
-        self.__durations: Dict[Tuple, int] = FixedSizeCache()
-        self.__map_match: Dict[Tuple, BasePosition] = FixedSizeCache()
         self.clock = router.clock
 
+        self.key = key if key is not None else ExactKey()
+        if isinstance(self.key, MapMatchKey) and self.key.map_match is None:
+            self.key.map_match = self.map_match
+
+        params = dict(
+            maxsize=maxsize, maxbytes=maxbytes, ttl=ttl, timer=self._now
+        )
+        self.__routes: Dict[Tuple, Route] = create_cache(policy, **params)
+        self.__durations: Dict[Tuple, int] = create_cache(policy, **params)
+        self.__map_match: Dict[Tuple, BasePosition] = create_cache(policy, **params)
+        self.__matrix: Dict[Tuple, np.ndarray] = create_cache(policy, **params)
+
+        self.store = None
+        if path is not None:
+            self.store = SQLiteStore(path)
+            if router_id is None:
+                router_id = router_identity(router)
+            # keys of different types should not be mixed
+            router_id = f"{router_id}|{self.key!r}"
+
+            self.__routes = PersistentCache(
+                self.__routes, self.store, router_id, "routes"
+            )
+            self.__durations = PersistentCache(
+                self.__durations, self.store, router_id, "durations"
+            )
+            self.__map_match = PersistentCache(
+                self.__map_match, self.store, router_id, "map_match"
+            )
+            self.__matrix = PersistentCache(
+                self.__matrix, self.store, router_id, "matrix"
+            )
+
+    def _now(self) -> int:
+        return self.clock.now
+
+    def flush(self):
+        """Write pending items to the persistent cache"""
+        if self.store is not None:
+            self.store.flush()
+
+    def cache_stats(self) -> Dict[str, Dict[str, int]]:
+        """Hits, misses, evictions and expirations of each cache"""
+        return {
+            "routes": self.__routes.stats,
+            "durations": self.__durations.stats,
+            "map_match": self.__map_match.stats,
+            "matrix": self.__matrix.stats,
+        }
+
     def map_match(self, position: BasePosition) -> BasePosition:
         key = position.coords
-        if key in self.__map_match:
-            return self.__map_match[key]
+        pos = self.__map_match.get(key)
 
-        pos = self.__router.map_match(position)
-        self.__map_match[key] = pos
+        if pos is None:
+            pos = self.__router.map_match(position)
+            self.__map_match[key] = pos
         return pos
 
+    def map_match_many(self, positions: List[BasePosition]) -> List[BasePosition]:
+        """Map match multiple positions, positions that are not in the cache
+        are matched by the router in a single batch"""
+
+        matched = self.__map_match.get_many([p.coords for p in positions])
+
+        # unique missing positions
+        missing: Dict[Tuple, BasePosition] = {}
+        for pos, m in zip(positions, matched):
+            if m is None:
+                missing.setdefault(pos.coords, pos)
+
+        if missing:
+            results = dict(
+                zip(missing, self.__router.map_match_many(list(missing.values())))
+            )
+            self.__map_match.put_many(results.items())
+
+            matched = [
+                results[p.coords] if m is None else m
+                for p, m in zip(positions, matched)
+            ]
+
+        return matched
+
     def calculate_route(self, origin: BasePosition, destination: BasePosition) -> Route:
-        key = (origin.coords, destination.coords)
+        key = (self.key(origin), self.key(destination))
         route = self.__routes.get(key)
         if route is None:
             route = self.__router.calculate_route(origin, destination)
             self.__routes[key] = route
+        return self._copy_route(route, origin, destination)
+
+    def _copy_route(
+        self, route: Route, origin: BasePosition, destination: BasePosition
+    ) -> Route:
+        """Cached routes are shared by multiple requests, so each request gets
+        a shallow copy with its own creation time, origin and destination"""
+
+        route = copy.copy(route)
         route.created_at = self.clock.now
+        route.origin = origin
+        route.destination = destination
+        if isinstance(route, LinearRoute):
+            # waypoints are calculated from origin and destination
+            route.coordinates = None
         return route
 
     def estimate_duration(self, origin: BasePosition, destination: BasePosition) -> int:
-        key = (origin.coords, destination.coords)
+        key = (self.key(origin), self.key(destination))
         duration = self.__durations.get(key)
 
         if duration is None:
@@ -53,53 +201,108 @@ class CachingRouter:
     def calculate_distance_matrix(
         self, sources: List[BasePosition], destinations: List[BasePosition]
     ) -> np.array:
+        """ Calculate all-to-all travel time using cached items. Only missing
+        source-destination pairs are requested from the router. Missing pairs
+        are grouped into blocks: sources with the same missing destinations
+        form a block. If there are more than `max_matrix_blocks` blocks,
+        a single block of all missing sources and destinations is requested
+        """
 
-        sources = sources[:]
-        destinations = destinations[:]
-
-        updated_sources = []
-        calculated = []
-        missing = dict()
+        matrix = np.full([len(sources), len(destinations)], np.nan)
+        if not sources or not destinations:
+            return matrix
 
-        for idx, s in enumerate(sources):
-            distances = []
+        source_keys = [self.key(s) for s in sources]
+        dest_hashes = self._key_hashes(destinations)
 
-            for d in destinations:
-                distances.append(self.__durations.get((s.coords, d.coords)))
+        rows = self.__matrix.get_many(source_keys)
+        # rows written together share arrays of hashes, {id(hashes): positions}
+        lookups: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        for i, row in enumerate(rows):
+            if row is not None:
+                hashes, values = row
+                lookup = lookups.get(id(hashes))
+                if lookup is None:
+                    idx = np.searchsorted(hashes, dest_hashes)
+                    idx = np.minimum(idx, len(hashes) - 1)
+                    found = hashes[idx] == dest_hashes
+                    lookup = lookups[id(hashes)] = (idx[found], found)
+                idx, found = lookup
+                matrix[i, found] = values[idx]
 
-            if not all(distances):
-                missing[len(updated_sources)] = idx
-                updated_sources.append(s)
-                calculated.append([])
-            else:
-                calculated.append(distances)
+        missing = np.isnan(matrix)
+        if not missing.any():
+            return matrix
 
-        matrix = self.__router.calculate_distance_matrix(updated_sources, destinations)
+        # {source key: updated row}
+        updates: Dict[Tuple, Tuple[np.ndarray, np.ndarray]] = {}
+        for block_rows, cols in self._missing_blocks(missing):
+            # each source is requested once
+            unique: Dict[Tuple, List[int]] = {}
+            for i in block_rows:
+                unique.setdefault(source_keys[i], []).append(i)
 
-        for k, v in missing.items():
-            distances = matrix[k]
-            calculated[v] = distances
+            block = self.__router.calculate_distance_matrix(
+                [sources[idx[0]] for idx in unique.values()],
+                [destinations[j] for j in cols],
+            )
+            block = np.asarray(block, dtype=float)
 
-            for idx, d in enumerate(destinations):
-                s = sources[v]
-                self.__durations[(s.coords, d.coords)] = distances[idx]
+            # new rows share the array of sorted hashes
+            hashes, order = np.unique(dest_hashes[cols], return_index=True)
 
-        matrix = np.array(calculated)
+            for (key, idx), values in zip(unique.items(), block):
+                matrix[np.ix_(idx, cols)] = values
+                row = updates.get(key) or rows[idx[0]]
+                if row is None:
+                    updates[key] = (hashes, values[order])
+                else:
+                    updates[key] = _merge_row(row, dest_hashes[cols], values)
 
+        self.__matrix.put_many(updates.items())
         return matrix
 
+    def _key_hashes(self, positions: List[BasePosition]) -> np.ndarray:
+        """Stable 64 bit hashes of cache keys of positions, they identify
+        destinations in cached matrix rows and can be stored on disk"""
+        hashes = [
+            hashlib.blake2b(repr(self.key(p)).encode(), digest_size=8).digest()
+            for p in positions
+        ]
+        return np.frombuffer(b"".join(hashes), dtype=np.uint64)
 
-class FixedSizeCache(OrderedDict):
-    """
-    Dictionary that stores fixed number of items. Every time
-    the size of the dictionary grows to maxsize, items removed in FIFO order
-    """
+    def _missing_blocks(self, missing: np.ndarray) -> List[Tuple[List[int], List[int]]]:
+        """Group missing items of a matrix into blocks of rows and columns"""
+
+        blocks: Dict[bytes, List[int]] = {}
+        for i in np.flatnonzero(missing.any(axis=1)).tolist():
+            blocks.setdefault(missing[i].tobytes(), []).append(i)
+
+        if len(blocks) > self.max_matrix_blocks:
+            rows = np.flatnonzero(missing.any(axis=1)).tolist()
+            cols = np.flatnonzero(missing.any(axis=0)).tolist()
+            return [(rows, cols)]
+
+        return [
+            (rows, np.flatnonzero(missing[rows[0]]).tolist())
+            for rows in blocks.values()
+        ]
+
+
+def _merge_row(
+    row: Optional[Tuple[np.ndarray, np.ndarray]], hashes: np.ndarray, values: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Add durations to destinations to a cached row - arrays of destination
+    hashes (sorted) and durations. New values replace the old ones"""
+
+    if row is not None:
+        hashes = np.concatenate([hashes, row[0]])
+        values = np.concatenate([values, row[1]])
+
+    # the first occurrence of each hash - new values are the first
+    hashes, idx = np.unique(hashes, return_index=True)
+    return hashes, values[idx]
 
-    def __init__(self, maxsize=10240, *args, **kwargs):
-        self.maxsize = maxsize
-        super().__init__(*args, **kwargs)
 
-    def __setitem__(self, key, value):
-        super().__setitem__(key, value)
-        if len(self) > self.maxsize:
-            self.popitem(last=True)
+# kept for backward compatibility
+FixedSizeCache = LRUCache
@@ -0,0 +1,250 @@
+import pickle
+import sqlite3
+import weakref
+from typing import Any, Dict, Hashable, Iterable, List, Tuple
+from .cache import LRUCache
+
+_MISSING = object()
+
+
+def router_identity(router) -> str:
+    """ Identity of a router used to separate cached items of different
+    routers in a persistent cache. It includes the router class, its
+    parameters of simple types (e.g. speed, server) and clock units
+    since durations are stored in clock units
+    """
+
+    params = {
+        name: value
+        for name, value in vars(router).items()
+        if isinstance(value, (str, int, float, bool)) and not name.startswith("_")
+    }
+
+    clock = router.clock
+    params["clock"] = f"{clock.time_step}{clock.time_unit}"
+
+    params = ",".join(f"{k}={v}" for k, v in sorted(params.items()))
+    return f"{type(router).__name__}({params})"
+
+
+class SQLiteStore:
+    """ Key-value storage in a SQLite file. Values are pickled, keys are
+    stored as their `repr`, so they have to be made of simple types,
+    e.g. tuples of coordinates.
+
+    Items are separated by namespace - router identity, and kind - type
+    of routing requests. Writes are committed in batches, call `flush`
+    to commit pending writes. The file can be shared by multiple runs
+    and processes.
+    """
+
+    # max number of keys in a single query, old versions of SQLite
+    # allow up to 999 parameters
+    max_query_keys = 900
+
+    def __init__(self, path: str, batch_size: int = 1000, timeout: float = 30):
+        """
+        Parameters
+        ----------
+
+        path : str
+            Path to a SQLite file, it is created if it does not exist
+
+        batch_size : int
+            Number of writes committed at once
+
+        timeout : float
+            Seconds to wait for a lock if the file is used by another process
+        """
+        self.path = path
+        self.batch_size = batch_size
+
+        self._conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS routing_cache ("
+            "namespace TEXT, kind TEXT, key TEXT, value BLOB, "
+            "PRIMARY KEY (namespace, kind, key))"
+        )
+        self._conn.commit()
+
+        # {(namespace, kind, key): (namespace, kind, key, value)}
+        self._pending: Dict[Tuple[str, str, str], Tuple[str, str, str, bytes]] = {}
+        # commit pending writes when the store is garbage collected or
+        # the interpreter exits
+        self._finalizer = weakref.finalize(
+            self, SQLiteStore._commit, self._conn, self._pending
+        )
+
+    @staticmethod
+    def _commit(conn: sqlite3.Connection, pending: Dict):
+        if pending:
+            conn.executemany(
+                "INSERT OR REPLACE INTO routing_cache VALUES (?, ?, ?, ?)",
+                list(pending.values()),
+            )
+            pending.clear()
+        conn.commit()
+
+    def flush(self):
+        self._commit(self._conn, self._pending)
+
+    def close(self):
+        self.flush()
+        self._finalizer.detach()
+        self._conn.close()
+
+    def get(self, namespace: str, kind: str, key: Hashable, default: Any = None) -> Any:
+        item = (namespace, kind, repr(key))
+
+        pending = self._pending.get(item)
+        if pending is not None:
+            return pickle.loads(pending[3])
+
+        row = self._conn.execute(
+            "SELECT value FROM routing_cache WHERE namespace=? AND kind=? AND key=?",
+            item,
+        ).fetchone()
+
+        if row is None:
+            return default
+        return pickle.loads(row[0])
+
+    def get_many(
+        self, namespace: str, kind: str, keys: List[Hashable], default: Any = None
+    ) -> List[Any]:
+        """Values of multiple keys, missing keys are read in a few queries"""
+
+        names = [repr(key) for key in keys]
+
+        # {key name: pickled value}
+        found: Dict[str, bytes] = {}
+        query = []
+        for name in dict.fromkeys(names):
+            pending = self._pending.get((namespace, kind, name))
+            if pending is not None:
+                found[name] = pending[3]
+            else:
+                query.append(name)
+
+        for start in range(0, len(query), self.max_query_keys):
+            chunk = query[start : start + self.max_query_keys]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._conn.execute(
+                "SELECT key, value FROM routing_cache "
+                f"WHERE namespace=? AND kind=? AND key IN ({placeholders})",
+                (namespace, kind, *chunk),
+            )
+            found.update(rows)
+
+        values = {name: pickle.loads(data) for name, data in found.items()}
+        return [values.get(name, default) for name in names]
+
+    def put(self, namespace: str, kind: str, key: Hashable, value: Any):
+        self.put_many(namespace, kind, [(key, value)])
+
+    def put_many(self, namespace: str, kind: str, items: Iterable[Tuple[Hashable, Any]]):
+        """Add items to pending writes, they are committed in a single
+        transaction when there are `batch_size` pending writes"""
+
+        for key, value in items:
+            item = (namespace, kind, repr(key))
+            data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            self._pending[item] = item + (data,)
+
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def count(self, namespace: str = None) -> int:
+        self.flush()
+        if namespace is None:
+            query = "SELECT COUNT(*) FROM routing_cache"
+            return self._conn.execute(query).fetchone()[0]
+
+        query = "SELECT COUNT(*) FROM routing_cache WHERE namespace=?"
+        return self._conn.execute(query, (namespace,)).fetchone()[0]
+
+
+class PersistentCache:
+    """ Two level cache: items are looked up in memory and then in
+    a persistent store. Items found in the store are added to the memory
+    cache. All new items are written to both levels.
+
+    The interface is the same as of LRUCache
+    """
+
+    def __init__(self, cache: LRUCache, store: SQLiteStore, namespace: str, kind: str):
+        self.cache = cache
+        self.store = store
+        self.namespace = namespace
+        self.kind = kind
+
+        self.disk_hits = 0
+        self.disk_misses = 0
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        stats = self.cache.stats
+        stats["disk_hits"] = self.disk_hits
+        stats["disk_misses"] = self.disk_misses
+        return stats
+
+    def __len__(self) -> int:
+        return len(self.cache)
+
+    def __contains__(self, key: Hashable) -> bool:
+        if key in self.cache:
+            return True
+        return self.store.get(self.namespace, self.kind, key, _MISSING) is not _MISSING
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        value = self.cache.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        value = self.store.get(self.namespace, self.kind, key, _MISSING)
+        if value is _MISSING:
+            self.disk_misses += 1
+            return default
+
+        self.disk_hits += 1
+        self.cache[key] = value
+        return value
+
+    def get_many(self, keys: List[Hashable], default: Any = None) -> List[Any]:
+        """Values of multiple keys, items that are not in memory are read
+        from the store at once"""
+
+        values = self.cache.get_many(keys, _MISSING)
+        missing = [i for i, value in enumerate(values) if value is _MISSING]
+        if not missing:
+            return values
+
+        stored = self.store.get_many(
+            self.namespace, self.kind, [keys[i] for i in missing], _MISSING
+        )
+        for i, value in zip(missing, stored):
+            if value is _MISSING:
+                self.disk_misses += 1
+                values[i] = default
+            else:
+                self.disk_hits += 1
+                self.cache[keys[i]] = value
+                values[i] = value
+
+        return values
+
+    def __getitem__(self, key: Hashable) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def put_many(self, items: Iterable[Tuple[Hashable, Any]]):
+        items = list(items)
+        self.cache.put_many(items)
+        self.store.put_many(self.namespace, self.kind, items)
+
+    def __setitem__(self, key: Hashable, value: Any):
+        self.cache[key] = value
+        self.store.put(self.namespace, self.kind, key, value)
@@ -0,0 +1,67 @@
+from typing import List, Optional
+import numpy as np
+
+from ..core.geo_position import GeographicPosition
+from .base_route import BaseRoute
+
+
+class LinearRoute(BaseRoute):
+    """ Straight line route between origin and destination. Positions on
+    the route are calculated analytically, so the route does not keep any
+    intermediate points. Waypoints - one point per clock step - are created
+    only when `coordinates` are requested
+    """
+
+    def __init__(
+        self,
+        created_at: int,
+        duration: int,
+        distance: float,
+        origin: GeographicPosition,
+        destination: GeographicPosition,
+    ):
+        super().__init__(created_at, None, duration, distance, origin, destination)
+
+    @property
+    def coordinates(self) -> List[GeographicPosition]:
+        if self._coordinates is None:
+            origin, destination = self.origin, self.destination
+
+            x = np.linspace(origin.lon, destination.lon, self.duration + 1)
+            y = np.linspace(origin.lat, destination.lat, self.duration + 1)
+
+            path = np.array([x, y]).T.tolist()
+            self._coordinates = [GeographicPosition(x_, y_) for x_, y_ in path]
+
+        return self._coordinates
+
+    @coordinates.setter
+    def coordinates(self, coordinates: Optional[List[GeographicPosition]]):
+        self._coordinates = coordinates
+
+    def _traveled_fraction(self, at_time: int) -> float:
+        pcnt = (at_time - self.created_at) / self.duration
+        # if the method is called long after the trip was finished
+        return min(max(pcnt, 0), 1)
+
+    def approximate_position(self, at_time: int) -> GeographicPosition:
+        """Approximate position on the route at specific time"""
+
+        if self.duration <= 0:
+            return GeographicPosition(*self.origin.coords)
+
+        pcnt = self._traveled_fraction(at_time)
+
+        origin_lon, origin_lat = self.origin.coords
+        dest_lon, dest_lat = self.destination.coords
+
+        return GeographicPosition(
+            origin_lon + (dest_lon - origin_lon) * pcnt,
+            origin_lat + (dest_lat - origin_lat) * pcnt,
+        )
+
+    def traveled_distance(self, at_time: int) -> float:
+        if self.duration <= 0:
+            return 0.0
+
+        return self.distance * self._traveled_fraction(at_time)
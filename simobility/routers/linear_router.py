@@ -3,8 +3,9 @@ from math import ceil
 from typing import List, Tuple
 
 from ..core.geo_position import GeographicPosition
-from .route import Route
+from .linear_route import LinearRoute
 from .base_router import BaseRouter
+from .utils import haversine_matrix, positions_to_array, mins_to_clock_time
 
 
 class LinearRouter(BaseRouter):
@@ -26,7 +27,7 @@ class LinearRouter(BaseRouter):
 
     def calculate_route(
         self, origin: GeographicPosition, destination: GeographicPosition
-    ) -> Route:
+    ) -> LinearRoute:
         """
         Calculate route between 2 points
 
@@ -39,23 +40,55 @@ class LinearRouter(BaseRouter):
         Returns
         -------
 
-        route : Route
+        route : LinearRoute
         """
 
         trip_duration = self.estimate_duration(origin, destination)
+        distance_km = origin.distance(destination)
 
-        y = np.linspace(origin.lat, destination.lat, trip_duration + 1)
-        x = np.linspace(origin.lon, destination.lon, trip_duration + 1)
+        return LinearRoute(
+            self.clock.now, trip_duration, distance_km, origin, destination
+        )
 
-        path = np.array([x, y]).T.tolist()
-        waypoints = [GeographicPosition(x_, y_) for x_, y_ in path]
+    def calculate_distance_matrix(
+        self,
+        sources: List[GeographicPosition],
+        destinations: List[GeographicPosition],
+        travel_time: bool = True,
+    ) -> np.array:
+        """ Calculate all-to-all travel time - all source to all destinations.
+        Distances of all pairs are calculated at once
 
-        distance_km = origin.distance(destination)
+        Params
+        ------
+
+        sources : list
+            List of Positions
+
+        destinations : list
+            List of Positions
+
+        travel_time : bool
+            Return travel time in clock units if True, otherwise
+            haversine distance in km
 
-        return Route(
-            self.clock.now, waypoints, trip_duration, distance_km, origin, destination
+        Returns
+        -------
+
+        distance_matrix : np.array
+        """
+
+        distance_km = haversine_matrix(
+            positions_to_array(sources), positions_to_array(destinations)
         )
 
+        if not travel_time:
+            return distance_km
+
+        # the same as estimate_duration
+        travel_time = distance_km / self.speed * 60
+        return mins_to_clock_time(travel_time, self.clock).astype(float)
+
     def estimate_duration(
         self, origin: GeographicPosition, destination: GeographicPosition
     ) -> int:
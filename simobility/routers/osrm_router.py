@@ -1,8 +1,11 @@
 from math import ceil
-from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 import numpy as np
 import logging
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from ..core.geo_position import GeographicPosition
 from .route import Route
 from .utils import mins_to_clock_time
@@ -15,22 +18,110 @@ class OSRMRouter(BaseRouter):
     https://github.com/Project-OSRM/osrm-backend for instructions on
     how to set up an OSRM server.
 
+    Requests are sent over a pool of keep-alive connections. Batch methods
+    (`calculate_routes`, `map_match_many`) send independent requests
+    concurrently.
+
     Usage sample::
 
         >>> from .routers.osrm_router import OSRMRouter
         >>> my_router = OSRMRouter(clock=clock, server=server)
     """
 
-    def __init__(self, clock, server: str):
+    def __init__(
+        self,
+        clock,
+        server: str,
+        pool_size: int = 10,
+        timeout: Optional[float] = 30,
+        retries: int = 3,
+        max_table_size: int = 100,
+        max_url_length: int = 8000,
+    ):
+        """
+        Parameters
+        ----------
+
+        clock : Clock
+
+        server : str
+            OSRM server url, e.g. http://localhost:5000
+
+        pool_size : int
+            Max number of connections to the server and concurrent requests
+            made by batch methods
+
+        timeout : float
+            Seconds to wait for the server response
+
+        retries : int
+            Number of retries of failed connections and requests
+            that failed with 502, 503 or 504 errors
+
+        max_table_size : int
+            The same as `--max-table-size` of osrm-routed: a table request
+            can have up to max_table_size ** 2 source-destination pairs. Larger
+            distance matrices are split into tiles requested concurrently
+
+        max_url_length : int
+            Max length of a request url, it limits the number of coordinates
+            in a table request
+        """
         self.clock = clock
         self.server = server
+        # connection settings do not affect results, they are private to
+        # keep them out of the router identity in persistent caches
+        self._pool_size = pool_size
+        self._timeout = timeout
+        self._max_table_size = max_table_size
+        self._max_url_length = max_url_length
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=0.1,
+            status_forcelist=[502, 503, 504],
+            allowed_methods=["GET"],
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def close(self):
+        """Close connections and stop threads used by batch requests"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        self.session.close()
+
+    def _query(self, service: str, sources: List, destinations: List) -> Dict:
+        return self.request(_osrm_query(self.server, service, sources, destinations))
+
+    def request_many(self, queries: List[str]) -> List[Dict]:
+        """Send requests concurrently, results have the same order as queries"""
+        if len(queries) < 2:
+            return [self.request(q) for q in queries]
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self._pool_size, thread_name_prefix="osrm"
+            )
+        return list(self._executor.map(self.request, queries))
 
     def map_match(self, position: GeographicPosition) -> GeographicPosition:
-        coords = "{},{}".format(*position.coords)
-        query = f"{self.server}/nearest/v1/driving/{coords}"
-        data = self.request(query, None)
-        location = data["waypoints"][0]["location"]
-        return GeographicPosition(*location)
+        return _parse_nearest(self._query("nearest", [position], []))
+
+    def map_match_many(
+        self, positions: List[GeographicPosition]
+    ) -> List[GeographicPosition]:
+        """Map match multiple positions concurrently"""
+        queries = [_osrm_query(self.server, "nearest", [p], []) for p in positions]
+        return [_parse_nearest(data) for data in self.request_many(queries)]
 
     def calculate_route(self, origin: GeographicPosition, destination: GeographicPosition) -> Route:
         """
@@ -48,8 +139,24 @@ class OSRMRouter(BaseRouter):
         route : Route
         """
 
-        data = _query_osrm(self.server, "route", [origin], [destination])
+        data = self._query("route", [origin], [destination])
+        return self._parse_route(data, origin, destination)
+
+    def calculate_routes(
+        self, pairs: List[Tuple[GeographicPosition, GeographicPosition]]
+    ) -> List[Route]:
+        """Calculate routes between multiple pairs of origins and destinations
+        concurrently"""
+
+        queries = [_osrm_query(self.server, "route", [o], [d]) for o, d in pairs]
+        results = self.request_many(queries)
+        return [
+            self._parse_route(data, o, d) for data, (o, d) in zip(results, pairs)
+        ]
 
+    def _parse_route(
+        self, data: Dict, origin: GeographicPosition, destination: GeographicPosition
+    ) -> Route:
         geom = data["routes"][0]["geometry"]
         # convert route coordinates to Postion datatypes
         # coordinates = [origin] + [Position(*c) for c in geom["coordinates"]]
@@ -88,7 +195,7 @@ class OSRMRouter(BaseRouter):
             Trip duration in clock units
         """
 
-        data = _query_osrm(self.server, "table", [origin], [destination])
+        data = self._query("table", [origin], [destination])
 
         if data["durations"][0][0] is None:
             logging.warning("Estimated duration is None")
@@ -128,33 +235,68 @@ class OSRMRouter(BaseRouter):
         travel_time = np.zeros([len(sources), len(destinations)])
 
         if sources and destinations:
+            sources = list(sources)
+            destinations = list(destinations)
 
-            data = _query_osrm(self.server, "table", sources, destinations)
+            tiles = self.table_tiles(len(sources), len(destinations))
+            queries = [
+                _osrm_query(self.server, "table", sources[rows], destinations[cols])
+                for rows, cols in tiles
+            ]
 
-            # convert to minutes
-            travel_time = np.array(data["durations"]).astype(np.float)
-            # replace None with 0
+            # durations in seconds, None is converted to nan
+            travel_time = np.empty([len(sources), len(destinations)])
+            for (rows, cols), data in zip(tiles, self.request_many(queries)):
+                travel_time[rows, cols] = np.array(data["durations"], dtype=float)
+
+            # replace None with max int
             idx = np.isnan(travel_time)
             travel_time[idx] = np.iinfo(np.int32).max
+            # convert to minutes
             travel_time = travel_time / 60
             travel_time = mins_to_clock_time(travel_time, self.clock)
 
         return travel_time
 
-    def request(self, path, payload):
-        response = requests.get(path)
+    def table_tiles(self, n_sources: int, n_destinations: int) -> List[Tuple[slice, slice]]:
+        """Split a distance matrix into tiles that fit into a single table
+        request. Returns a list of row and column slices"""
+
+        max_pairs = self._max_table_size ** 2
+        # approximate length of one coordinate and its index in url,
+        # e.g. "-73.935242,40.730611;" and "123;"
+        max_coords = max(self._max_url_length // 30, 2)
 
+        rows = min(n_sources, self._max_table_size, max_coords - 1)
+        cols = min(n_destinations, max_pairs // rows, max_coords - rows)
+
+        return [
+            (slice(i, i + rows), slice(j, j + cols))
+            for i in range(0, n_sources, rows)
+            for j in range(0, n_destinations, cols)
+        ]
+
+    def request(self, path: str, payload=None) -> Dict:
+        response = self.session.get(path, timeout=self._timeout)
+
+        # Catch errors and fail hard
         if not response.ok:
             logging.error(response.text)
-            raise Exception("OSRM Routing error")
+            raise Exception(
+                f"Query {path}\nFailed with response {response}, ERROR {response.status_code}"
+            )
 
         return response.json()
 
 
-def _query_osrm(server: str, service: str, sources: List, destinations: List) -> Dict:
+def _parse_nearest(data: Dict) -> GeographicPosition:
+    location = data["waypoints"][0]["location"]
+    return GeographicPosition(*location)
+
+
+def _osrm_query(server: str, service: str, sources: List, destinations: List) -> str:
     """
-    Static helper function to form GET request for OSRM backend, make request,
-    check for errors, and return pre-parsed data.
+    Static helper function to form GET request for OSRM backend
     """
     # Form GET request URL string, see
     # https://github.com/Project-OSRM/osrm-backend/blob/master/docs/http.md#example-request-1)
@@ -174,17 +316,7 @@ def _query_osrm(server: str, service: str, sources: List, destinations: List) ->
         query = query + f"?sources={sources}&destinations={destinations}"
         query += "&generate_hints=false"
 
-    else:
+    elif service != "nearest":
         raise NotImplementedError(f"OSRM service {service} not implemented.")
 
-    # Make request to server and parse response
-    response = requests.get(query)
-
-    # Catch errors and fail hard
-    if not response.status_code == 200:
-        logging.error(response.text)
-        raise Exception(
-            f"Query {query}\nFailed with response {response}, ERROR {response.status_code}"
-        )
-
-    return response.json()
+    return query
@@ -1,11 +1,17 @@
-from typing import List
+from typing import List, Iterable
+import numpy as np
 
-from .utils import linear_approximation
+from .utils import haversine_distances, positions_to_array
 from ..core.geo_position import GeographicPosition
 from .base_route import BaseRoute
 
 
 class Route(BaseRoute):
+    """ Route with geometry, e.g. calculated by OSRM. Coordinates and
+    cumulative distances along the route are converted to arrays once,
+    positions are found by binary search over the cumulative distances
+    """
+
     def __init__(
         self,
         created_at: int,
@@ -21,28 +27,52 @@ class Route(BaseRoute):
         )
 
         # internal variables
-        segments = list(zip(self.coordinates, self.coordinates[1:]))
-        seg_distance = [p1.distance(p2) for p1, p2 in segments]
-        self.__segment_distance: List[float] = seg_distance
+        self.__points = positions_to_array(self.coordinates)
+        seg_distance = haversine_distances(self.__points[:-1], self.__points[1:])
+        # distance from the first point to the end of each segment
+        self.__acc_distance = np.cumsum(seg_distance)
 
-    def approximate_position(self, at_time: int) -> GeographicPosition:
-        """Approximate position on the route at specific time"""
+    def _approximate_coords(self, times: np.ndarray) -> np.ndarray:
+        """Coordinates of approximate positions at multiple points of time,
+        see utils.linear_approximation for details"""
 
-        points = [p.coords for p in self.coordinates]
+        points = self.__points
+        acc_distance = self.__acc_distance
 
-        pos = GeographicPosition(*points[-1])
+        if self.duration <= 0 or len(points) == 1:
+            return np.repeat(points[-1:], len(times), axis=0)
 
-        if self.duration > 0:
+        # calculate percentage of trip accomplished by the time
+        # if the method is called long after the trip was finished
+        pcnt = np.clip((times - self.created_at) / self.duration, 0, 1)
+        distance = acc_distance[-1] * pcnt
 
-            # calculate percentage of trip accomplished by the time
-            pcnt = (at_time - self.created_at) / self.duration
-            # if the method is called long after the trip was finished
-            pcnt = min(1, pcnt)
+        # index of the segment where the point is
+        idx = np.searchsorted(acc_distance, distance, side="left")
+        idx = np.minimum(idx, len(acc_distance) - 1)
+
+        max_dist = acc_distance[idx]
+        min_dist = np.where(idx > 0, acc_distance[idx - 1], 0)
+
+        diff = max_dist - min_dist
+        with np.errstate(divide="ignore", invalid="ignore"):
+            fraction = np.where(diff > 0, (distance - min_dist) / diff, 0)
+        fraction = np.minimum(fraction, 1)[:, np.newaxis]
+
+        start = points[idx]
+        return start + (points[idx + 1] - start) * fraction
+
+    def approximate_position(self, at_time: int) -> GeographicPosition:
+        """Approximate position on the route at specific time"""
+
+        coords = self._approximate_coords(np.array([at_time]))[0]
+        return GeographicPosition(*coords.tolist())
 
-            coords = linear_approximation(pcnt, points, self.__segment_distance)
-            pos = GeographicPosition(*coords)
+    def approximate_positions(self, times: Iterable[int]) -> List[GeographicPosition]:
+        """Approximate positions on the route at multiple points of time"""
 
-        return pos
+        coords = self._approximate_coords(np.asarray(list(times), dtype=float))
+        return [GeographicPosition(x, y) for x, y in coords.tolist()]
 
     def traveled_distance(self, at_time: int) -> float:
         duration = 0.0
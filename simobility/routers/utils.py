@@ -2,7 +2,6 @@ import itertools
 import logging
 from typing import List, Tuple
 import numpy as np
-from math import ceil
 
 
 def linear_approximation(
@@ -107,9 +106,56 @@ def mins_to_clock_time(time_array, clock):
         Array with items converted to clock time
     """
 
-    def __to_clock_time(v):
-        return ceil(clock.time_to_clock_time(v, "m"))
+    # the same as Clock.time_to_clock_time but for the whole array
+    time_array = np.asarray(time_array, dtype=float) / clock.units["m"] * clock.unit
+    return np.ceil(time_array / clock.time_step).astype(np.int64)
 
-    to_clock_time_vec = np.vectorize(__to_clock_time)
-    time_array = to_clock_time_vec(time_array)
-    return time_array
+
+# the same radius as used by haversine package
+EARTH_RADIUS_KM = 6371.0088
+
+
+def positions_to_array(positions: List) -> np.ndarray:
+    """Stack coordinates of positions into an array of shape (n, 2)"""
+    return np.array([p.coords for p in positions], dtype=float).reshape(-1, 2)
+
+
+def haversine_distances(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """ Element-wise haversine distances in kilometers between arrays
+    of lon/lat coordinates of shape (..., 2). Arrays are broadcasted
+    """
+
+    lon1 = np.radians(a[..., 0])
+    lat1 = np.radians(a[..., 1])
+    lon2 = np.radians(b[..., 0])
+    lat2 = np.radians(b[..., 1])
+
+    d = (
+        np.sin((lat2 - lat1) * 0.5) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) * 0.5) ** 2
+    )
+    return EARTH_RADIUS_KM * 2 * np.arcsin(np.sqrt(d))
+
+
+def haversine_matrix(sources: np.ndarray, destinations: np.ndarray) -> np.ndarray:
+    """ All-to-all haversine distances in kilometers
+
+    Parameters
+    ----------
+
+    sources : np.array
+        Array of shape (n, 2) with lon/lat coordinates
+
+    destinations : np.array
+        Array of shape (m, 2) with lon/lat coordinates
+
+    Returns
+    -------
+
+    distance_matrix : np.array
+        Array of shape (n, m) with distances in km
+    """
+
+    return haversine_distances(
+        sources[:, np.newaxis, :], destinations[np.newaxis, :, :]
+    )
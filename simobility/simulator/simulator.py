@@ -1,9 +1,12 @@
+import heapq
 import logging
+from typing import List
 from dataclasses import dataclass
 from simobility.core import Fleet
 from simobility.core import BookingService
 from simobility.core import Dispatcher
 from simobility.core.clock import Clock
+from simobility.core.loggers import flush_state_change_sinks
 
 
 @dataclass
@@ -51,26 +54,105 @@ class Simulator:
         logging.info(f"Number of simulation steps: {num_steps}")
 
         for i in range(num_steps):
+            self.step(demand)
+            self.clock.tick()
+
+        self.fleet.stop_vehicles()
 
-            bookings = demand.next()
-            self.booking_service.add_bookings(bookings)
+        # write logs buffered by state change sinks
+        flush_state_change_sinks()
 
-            # change booking state to pending
-            self.booking_service.step()
+    def step(self, demand):
+        """Run one simulation step at the current clock time"""
 
-            # update vehicle states
-            self.fleet.step()
+        bookings = demand.next()
+        self.booking_service.add_bookings(bookings)
 
-            # match pending bookings and create itineraries
-            itineraries = self.matcher.step()
-            # itineraries = customer.filter(itineraries)
-            for it in itineraries:
-                self.dispatcher.dispatch(it)
+        # change booking state to pending
+        self.booking_service.step()
 
-            # change booking state to matched and waiting for pickup or dropoff
-            # ask vehicles to move
-            self.dispatcher.step()
+        # update vehicle states
+        self.fleet.step()
 
-            self.clock.tick()
+        # match pending bookings and create itineraries
+        itineraries = self.matcher.step()
+        # itineraries = customer.filter(itineraries)
+        for it in itineraries:
+            self.dispatcher.dispatch(it)
+
+        # change booking state to matched and waiting for pickup or dropoff
+        # ask vehicles to move
+        self.dispatcher.step()
+
+
+class EventSimulator(Simulator):
+    """ Next-event scheduler. Instead of running every clock step, it keeps
+    a priority queue of clock times when something can happen and moves
+    the clock straight to the next one. Results are the same as of
+    `Simulator.simulate`, but runtime depends on the number of events,
+    not on the number of clock steps.
+
+    Events are:
+    - vehicle arrivals - Fleet.next_arrival_time
+    - booking expirations - BookingService.next_expiration_time
+    - demand arrivals - demand.next_event_time
+    - matcher runs - matcher.next_event_time
+
+    Demand models and matchers without `next_event_time` method are called
+    on every clock step. Matchers are called only when there are pending
+    bookings.
+    """
+
+    def simulate(self, demand, duration_mins: int):
+        num_steps = self.clock.time_to_clock_time(duration_mins, "m")
+        logging.info(f"Number of simulation steps: {num_steps}")
 
+        end_time = self.clock.clock_time + num_steps
+
+        events = [self.clock.clock_time]
+        scheduled = set(events)
+
+        num_events = 0
+        while events:
+            time = heapq.heappop(events)
+            scheduled.discard(time)
+
+            self.clock.set_clock_time(time)
+            self.step(demand)
+            num_events += 1
+
+            for next_time in self.next_event_times(demand):
+                if time < next_time < end_time and next_time not in scheduled:
+                    scheduled.add(next_time)
+                    heapq.heappush(events, next_time)
+
+        logging.info(f"Number of processed events: {num_events}")
+
+        self.clock.set_clock_time(end_time)
         self.fleet.stop_vehicles()
+
+        # write logs buffered by state change sinks
+        flush_state_change_sinks()
+
+    def next_event_times(self, demand) -> List[int]:
+        """Clock times of the next events of each of the simulation entities"""
+
+        next_step = self.clock.clock_time + 1
+
+        times = [
+            self.fleet.next_arrival_time(),
+            self.booking_service.next_expiration_time(),
+        ]
+
+        if hasattr(demand, "next_event_time"):
+            times.append(demand.next_event_time())
+        else:
+            times.append(next_step)
+
+        if self.booking_service.num_bookings:
+            if hasattr(self.matcher, "next_event_time"):
+                times.append(self.matcher.next_event_time())
+            else:
+                times.append(next_step)
+
+        return [t for t in times if t is not None]
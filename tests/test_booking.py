@@ -1,4 +1,5 @@
 import pytest
+import numpy as np
 from unittest.mock import MagicMock
 from simobility.core.booking import Booking, States
 from simobility.core import GeographicPosition, Clock
@@ -159,3 +160,22 @@ def test_on_state_changed_pickup_position():
         booking.on_state_changed(event_data)
 
         assert event_data.kwargs["position"] == dropoff.to_dict()
+
+
+def test_create_many():
+    clock = Clock()
+    pickups = np.array([[13.3393, 52.5053], [13.4014, 52.5478]])
+    dropoffs = np.array([[13.4014, 52.5478], [13.3393, 52.5053]])
+
+    bookings = Booking.create_many(clock, pickups, dropoffs, seats=2)
+    assert len(bookings) == 2
+
+    for booking, pu, do in zip(bookings, pickups, dropoffs):
+        assert booking.is_pending()
+        assert booking.seats == 2
+        assert booking.pickup.coords == tuple(pu)
+        assert booking.dropoff.coords == tuple(do)
+        assert len(booking.id) == 32
+
+    assert bookings[0].id != bookings[1].id
+    assert Booking.create_many(clock, np.empty((0, 2)), np.empty((0, 2))) == []
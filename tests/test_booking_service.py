@@ -0,0 +1,70 @@
+import pytest
+from simobility.core import BookingService, Booking, Clock, GeographicPosition
+
+
+def create_booking(clock):
+    return Booking(clock, GeographicPosition(13.4014, 52.5478), GeographicPosition(13.3393, 52.5053))
+
+
+def test_add_booking():
+    clock = Clock()
+    service = BookingService(clock, 3)
+
+    booking = create_booking(clock)
+    service.add_booking(booking)
+    assert service.get_pending_bookings() == [booking]
+
+    booking = create_booking(clock)
+    booking.set_expired()
+    with pytest.raises(Exception):
+        service.add_booking(booking)
+
+
+def test_expiration():
+    clock = Clock()
+    service = BookingService(clock, 3)
+
+    b1 = create_booking(clock)
+    clock.tick()
+    b2 = create_booking(clock)
+    service.add_bookings([b1, b2])
+
+    assert service.next_expiration_time() == 4
+
+    # clock time is 1
+    for _ in range(2):
+        clock.tick()
+        service.step()
+        assert service.num_bookings == 2
+
+    clock.tick()
+    service.step()
+    assert b1.is_expired()
+    assert service.get_pending_bookings() == [b2]
+    assert service.next_expiration_time() == 5
+
+    clock.tick()
+    service.step()
+    assert b2.is_expired()
+    assert service.num_bookings == 0
+    assert service.next_expiration_time() is None
+
+
+def test_remove_non_pending():
+    clock = Clock()
+    service = BookingService(clock, 3)
+
+    b1 = create_booking(clock)
+    b2 = create_booking(clock)
+    service.add_bookings([b1, b2])
+
+    # booking leaves the queue as soon as it changes state
+    b1.set_matched()
+    assert service.get_pending_bookings() == [b2]
+
+    for _ in range(10):
+        clock.tick()
+        service.step()
+
+    assert b1.is_matched()
+    assert b2.is_expired()
@@ -0,0 +1,288 @@
+import pytest
+from unittest.mock import MagicMock
+from simobility.core import GeographicPosition
+from simobility.core.clock import Clock
+from simobility.routers import LinearRouter, CachingRouter
+from simobility.routers.cache import LRUCache, LFUCache, create_cache
+from simobility.routers.disk_cache import SQLiteStore
+
+
+def test_lru():
+    cache = LRUCache(maxsize=2)
+    cache["a"] = 1
+    cache["b"] = 2
+
+    # "a" becomes the most recently used
+    assert cache["a"] == 1
+
+    cache["c"] = 3
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+    assert len(cache) == 2
+
+    assert cache.get("b") is None
+    with pytest.raises(KeyError):
+        cache["b"]
+
+    assert cache.stats["hits"] == 1
+    assert cache.stats["misses"] == 2
+    assert cache.stats["evictions"] == 1
+
+
+def test_lfu():
+    cache = LFUCache(maxsize=2)
+    cache["a"] = 1
+    cache["b"] = 2
+
+    cache.get("a")
+    cache.get("a")
+    cache.get("b")
+
+    cache["c"] = 3
+    assert "a" in cache
+    assert "b" not in cache
+
+    # "c" is used less than "a"
+    cache["d"] = 4
+    assert "a" in cache
+    assert "c" not in cache
+    assert cache.evictions == 2
+
+
+def test_maxbytes():
+    cache = create_cache("lru", maxsize=None, maxbytes=100, sizeof=lambda v: v)
+    cache["a"] = 60
+    cache["b"] = 30
+    assert cache.nbytes == 90
+
+    cache["c"] = 20
+    assert "a" not in cache
+    assert cache.nbytes == 50
+
+    # too large to cache
+    cache["d"] = 200
+    assert "d" not in cache
+    assert len(cache) == 2
+
+
+def test_ttl():
+    clock = Clock()
+    cache = LRUCache(ttl=2, timer=lambda: clock.now)
+
+    cache["a"] = 1
+    clock.tick()
+    assert cache.get("a") == 1
+
+    clock.tick()
+    assert "a" not in cache
+    assert cache.get("a") is None
+    assert cache.expirations == 1
+    assert len(cache) == 0
+
+
+def test_caching_router_stats():
+    clock = Clock(time_step=1, time_unit="s")
+    router = CachingRouter(LinearRouter(clock=clock), maxsize=1)
+
+    p1 = GeographicPosition(-73.935242, 40.730610)
+    p2 = GeographicPosition(-73.93, 40.74)
+
+    duration = router.estimate_duration(p1, p2)
+    assert router.estimate_duration(p1, p2) == duration
+    router.estimate_duration(p2, p1)
+
+    stats = router.cache_stats()
+    assert stats["durations"]["hits"] == 1
+    assert stats["durations"]["misses"] == 2
+    assert stats["durations"]["evictions"] == 1
+    assert stats["routes"]["size"] == 0
+
+
+def test_persistent_cache(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    clock = Clock(time_step=1, time_unit="s")
+
+    p1 = GeographicPosition(-73.935242, 40.730610)
+    p2 = GeographicPosition(-73.93, 40.74)
+
+    router = CachingRouter(LinearRouter(clock=clock), path=path)
+    duration = router.estimate_duration(p1, p2)
+    route = router.calculate_route(p1, p2)
+    router.flush()
+
+    clock.tick()
+
+    # a new run with an empty memory cache
+    base_router = LinearRouter(clock=clock)
+    router = CachingRouter(base_router, path=path)
+    base_router.estimate_duration = None
+    base_router.calculate_route = None
+
+    assert router.estimate_duration(p1, p2) == duration
+    cached = router.calculate_route(p1, p2)
+    assert cached.duration == route.duration
+    assert cached.created_at == clock.now
+    assert cached.origin is p1
+    assert router.cache_stats()["routes"]["disk_hits"] == 1
+
+    # a route loaded from disk is not shared either
+    clock.tick()
+    assert router.calculate_route(p1, p2) is not cached
+    assert cached.created_at == clock.now - 1
+
+    # routers with different parameters do not share items
+    router = CachingRouter(LinearRouter(clock=clock, speed=5), path=path)
+    assert router.estimate_duration(p1, p2) > duration
+
+
+def test_store_many(tmp_path):
+    store = SQLiteStore(str(tmp_path / "cache.db"), batch_size=10)
+    store.max_query_keys = 3
+
+    # committed in a single transaction
+    store.put_many("ns", "kind", [((i, i), i * 10) for i in range(20)])
+    assert store.count() == 20
+
+    # pending items are found too
+    store.put_many("ns", "kind", [((i, i), i * 10) for i in range(20, 25)])
+    assert len(store._pending) == 5
+
+    keys = [(i, i) for i in range(30)] + [(0, 0)]
+    values = store.get_many("ns", "kind", keys, default=-1)
+    assert values == [i * 10 for i in range(25)] + [-1] * 5 + [0]
+    assert store.get_many("other", "kind", keys[:2]) == [None, None]
+
+    store.close()
+
+
+def test_distance_matrix_missing_block():
+    clock = Clock(time_step=1, time_unit="s")
+    base_router = LinearRouter(clock=clock)
+    base_router.calculate_distance_matrix = MagicMock(
+        wraps=base_router.calculate_distance_matrix
+    )
+    router = CachingRouter(base_router)
+
+    sources = [GeographicPosition(-73.9 - i * 0.01, 40.7) for i in range(3)]
+    destinations = [GeographicPosition(-73.9, 40.71 + i * 0.01) for i in range(3)]
+
+    expected = LinearRouter(clock=clock).calculate_distance_matrix(sources, destinations)
+
+    router.calculate_distance_matrix(sources[:2], destinations[:2])
+    matrix = router.calculate_distance_matrix(sources, destinations[:2])
+    assert (matrix == expected[:, :2]).all()
+
+    # only the new source was requested
+    args = base_router.calculate_distance_matrix.call_args[0]
+    assert args == ([sources[2]], destinations[:2])
+
+    matrix = router.calculate_distance_matrix(sources[1:], destinations)
+    assert (matrix == expected[1:]).all()
+
+    args = base_router.calculate_distance_matrix.call_args[0]
+    assert args == (sources[1:], [destinations[2]])
+
+
+def test_distance_matrix_cells():
+    clock = Clock(time_step=1, time_unit="s")
+    base_router = LinearRouter(clock=clock)
+    base_router.calculate_distance_matrix = MagicMock(
+        wraps=base_router.calculate_distance_matrix
+    )
+    router = CachingRouter(base_router)
+
+    positions = [GeographicPosition(-73.9 - i * 0.01, 40.7) for i in range(4)]
+    expected = LinearRouter(clock=clock).calculate_distance_matrix(positions, positions)
+
+    # zero durations on the diagonal are cached as well
+    router.calculate_distance_matrix(positions[:2], positions[:2])
+    assert expected[0, 0] == 0
+    assert (router.calculate_distance_matrix(positions[:2], positions[:2]) == expected[:2, :2]).all()
+    assert base_router.calculate_distance_matrix.call_count == 1
+
+    # a new destination for cached sources and a new source
+    matrix = router.calculate_distance_matrix(positions[:3], positions[:3])
+    assert (matrix == expected[:3, :3]).all()
+
+    calls = [c[0] for c in base_router.calculate_distance_matrix.call_args_list[1:]]
+    assert calls == [
+        (positions[:2], [positions[2]]),
+        ([positions[2]], positions[:3]),
+    ]
+
+
+def test_distance_matrix_new_destination():
+    clock = Clock(time_step=1, time_unit="s")
+    base_router = LinearRouter(clock=clock)
+    base_router.calculate_distance_matrix = MagicMock(
+        wraps=base_router.calculate_distance_matrix
+    )
+    router = CachingRouter(base_router)
+
+    sources = [GeographicPosition(-73.9 - i * 0.001, 40.7) for i in range(90)]
+    destinations = [GeographicPosition(-73.9, 40.71 + i * 0.001) for i in range(11)]
+    expected = LinearRouter(clock=clock).calculate_distance_matrix(sources, destinations)
+
+    router.calculate_distance_matrix(sources, destinations[:10])
+
+    # one new destination costs one column
+    matrix = router.calculate_distance_matrix(sources, destinations)
+    assert (matrix == expected).all()
+    args = base_router.calculate_distance_matrix.call_args[0]
+    assert args == (sources, [destinations[10]])
+
+    # cached destinations in a different order are not requested
+    cols = [7, 3, 10, 0, 5]
+    matrix = router.calculate_distance_matrix(sources, [destinations[j] for j in cols])
+    assert (matrix == expected[:, cols]).all()
+    assert base_router.calculate_distance_matrix.call_count == 2
+
+    # duplicated sources are requested once
+    new_source = GeographicPosition(-74.0, 40.7)
+    router.calculate_distance_matrix([new_source, sources[0], new_source], destinations[:2])
+    args = base_router.calculate_distance_matrix.call_args[0]
+    assert args == ([new_source], destinations[:2])
+
+    assert router.cache_stats()["matrix"]["size"] == 91
+
+
+def test_distance_matrix_persistent(tmp_path):
+    clock = Clock(time_step=1, time_unit="s")
+    path = str(tmp_path / "cache.db")
+
+    sources = [GeographicPosition(-73.9 - i * 0.001, 40.7) for i in range(30)]
+    destinations = [GeographicPosition(-73.9, 40.71 + i * 0.001) for i in range(20)]
+
+    router = CachingRouter(LinearRouter(clock=clock), path=path)
+    expected = router.calculate_distance_matrix(sources[:20], destinations)
+    router.flush()
+
+    base_router = LinearRouter(clock=clock)
+    base_router.calculate_distance_matrix = MagicMock(
+        wraps=base_router.calculate_distance_matrix
+    )
+    router = CachingRouter(base_router, path=path)
+    matrix = router.calculate_distance_matrix(sources, destinations)
+
+    assert (matrix[:20] == expected).all()
+    base_router.calculate_distance_matrix.assert_called_once_with(sources[20:], destinations)
+    assert router.cache_stats()["matrix"]["disk_hits"] == 20
+
+
+def test_map_match_many():
+    clock = Clock(time_step=1, time_unit="s")
+    base_router = LinearRouter(clock=clock)
+    base_router.map_match_many = MagicMock(wraps=base_router.map_match_many)
+    router = CachingRouter(base_router)
+
+    p1 = GeographicPosition(-73.935242, 40.730610)
+    p2 = GeographicPosition(-73.93, 40.74)
+
+    router.map_match(p1)
+    matched = router.map_match_many([p1, p2, p2])
+    assert matched == [p1, p2, p2]
+
+    # only unique missing positions are matched
+    base_router.map_match_many.assert_called_once_with([p2])
+    assert router.cache_stats()["map_match"]["size"] == 2
@@ -0,0 +1,97 @@
+import numpy as np
+from simobility.core import GeographicPosition
+from simobility.core.clock import Clock
+from simobility.routers import LinearRouter, CachingRouter
+from simobility.routers.cache_keys import ExactKey, GridKey, GeohashKey, MapMatchKey
+
+
+def random_positions(n, seed=1):
+    rng = np.random.RandomState(seed)
+    lon = rng.uniform(-74.0, -73.9, n)
+    lat = rng.uniform(40.7, 40.8, n)
+    return [GeographicPosition(x, y) for x, y in zip(lon, lat)]
+
+
+def test_exact_key():
+    pos = GeographicPosition(-73.935242, 40.730610)
+    key = ExactKey()
+    assert key(pos) == pos.coords
+    assert key.error(pos) == 0
+
+
+def test_grid_key():
+    key = GridKey(cell_size=100)
+
+    p1 = GeographicPosition(-73.935242, 40.730610)
+    p2 = GeographicPosition(-73.935243, 40.730611)
+    assert key(p1) == key(p2)
+
+    for pos in random_positions(200):
+        assert key.error(pos) <= key.max_error
+
+    # grid cells are about 100 meters wide
+    far = GeographicPosition(-73.935242 + 0.002, 40.730610)
+    assert key(p1) != key(far)
+
+
+def test_geohash_key():
+    key = GeohashKey(precision=5)
+    pos = GeographicPosition(-5.6, 42.6)
+    # https://en.wikipedia.org/wiki/Geohash
+    assert key(pos) == "ezs42"
+
+    key = GeohashKey(precision=7)
+    for pos in random_positions(200):
+        assert key.error(pos) <= key.max_error
+
+
+def test_caching_router_keys():
+    clock = Clock(time_step=1, time_unit="s")
+    router = CachingRouter(LinearRouter(clock=clock), key=GridKey(cell_size=200))
+
+    p1 = GeographicPosition(-73.935242, 40.730610)
+    p2 = GeographicPosition(-73.93, 40.74)
+    # less than 1 meter from p1
+    p3 = GeographicPosition(-73.935245, 40.730612)
+
+    duration = router.estimate_duration(p1, p2)
+    assert router.estimate_duration(p3, p2) == duration
+    assert router.cache_stats()["durations"]["hits"] == 1
+
+    matrix = router.calculate_distance_matrix([p3], [p2])
+    assert matrix[0, 0] == duration
+
+
+def test_map_match_key():
+    clock = Clock(time_step=1, time_unit="s")
+    router = CachingRouter(LinearRouter(clock=clock), key=MapMatchKey())
+
+    p1 = GeographicPosition(-73.935242, 40.730610)
+    p2 = GeographicPosition(-73.93, 40.74)
+
+    router.estimate_duration(p1, p2)
+    # LinearRouter map matches to the same coordinates
+    assert router.cache_stats()["map_match"]["size"] == 2
+
+
+def test_cached_routes_are_not_shared():
+    clock = Clock(time_step=1, time_unit="s")
+    router = CachingRouter(LinearRouter(clock=clock), key=GridKey(cell_size=200))
+
+    p1 = GeographicPosition(-73.935242, 40.730610)
+    p2 = GeographicPosition(-73.93, 40.74)
+    p3 = GeographicPosition(-73.935245, 40.730612)
+
+    route1 = router.calculate_route(p1, p2)
+    arrival_time = route1.arrival_time
+
+    clock.tick()
+    route2 = router.calculate_route(p3, p2)
+    assert router.cache_stats()["routes"]["hits"] == 1
+
+    assert route2 is not route1
+    assert route1.arrival_time == arrival_time
+    assert route2.created_at == clock.now
+    assert route2.origin is p3
+    assert route2.duration == route1.duration
+    assert route2.approximate_position(clock.now) == p3
@@ -0,0 +1,163 @@
+import pytest
+import numpy as np
+import pandas as pd
+from simobility.core.clock import Clock
+from simobility.core.tools import ReplayDemand
+from simobility.core.demand import (
+    save_demand,
+    sort_trips,
+    PrematchedDemand,
+    StreamingDemand,
+)
+from simobility.routers import LinearRouter
+
+
+def create_demand_file(path):
+    data = pd.DataFrame(
+        {
+            "pickup_datetime": pd.to_datetime(
+                [
+                    "2020-01-01 10:02:00",
+                    "2020-01-01 10:00:00",
+                    "2020-01-01 10:00:00",
+                    "2020-01-01 10:00:20",
+                    "2020-01-01 10:02:00",
+                ]
+            ),
+            "pickup_lon": [-73.97, -73.95, -73.96, -73.90, -73.98],
+            "pickup_lat": [40.77, 40.75, 40.76, 40.70, 40.78],
+            # the last trip is too short
+            "dropoff_lon": [-73.92, -73.90, -73.91, -73.91, -73.98],
+            "dropoff_lat": [40.72, 40.70, 40.71, 40.71, 40.7801],
+        }
+    )
+    data.to_feather(path)
+
+
+def create_replay_demand(path, clock, map_matcher=None):
+    return ReplayDemand(
+        clock,
+        path,
+        pd.to_datetime("2020-01-01 10:00:00"),
+        pd.to_datetime("2020-01-01 11:00:00"),
+        round_to="1min",
+        map_matcher=map_matcher,
+    )
+
+
+def trips(bookings):
+    return [(b.pickup.coords, b.dropoff.coords) for b in bookings]
+
+
+def test_prematched_demand(tmp_path):
+    path = str(tmp_path / "demand.feather")
+    create_demand_file(path)
+
+    clock = Clock(time_step=1, time_unit="m", starting_time="2020-01-01 10:00:00")
+    replay = create_replay_demand(path, clock, map_matcher=LinearRouter(clock))
+
+    output = str(tmp_path / "demand.arrow")
+    save_demand(replay, output)
+
+    demand = PrematchedDemand(clock, output)
+    assert len(demand) == 4
+    assert demand.next_event_time() == 2
+
+    for _ in range(5):
+        assert trips(demand.next()) == trips(replay.next())
+        clock.tick()
+
+    assert demand.next_event_time() is None
+
+
+def test_prematched_demand_clock_step(tmp_path):
+    path = str(tmp_path / "demand.feather")
+    create_demand_file(path)
+
+    # demand is saved with a clock step of 1 minute
+    clock = Clock(time_step=1, time_unit="m", starting_time="2020-01-01 10:00:00")
+    output = str(tmp_path / "demand.arrow")
+    save_demand(create_replay_demand(path, clock), output)
+
+    clock = Clock(time_step=20, time_unit="s", starting_time="2020-01-01 10:00:00")
+    demand = PrematchedDemand(clock, output)
+
+    # 10:00:20 is rounded to 10:00
+    assert len(demand.next()) == 3
+    clock.set_clock_time(6)
+    assert len(demand.next()) == 1
+    assert [b.created_at for b in demand.next(0)] == [6, 6, 6]
+
+
+def create_trips(n=40, seed=3):
+    rng = np.random.RandomState(seed)
+    seconds = np.sort(rng.randint(0, 20 * 60, n))
+    return pd.DataFrame(
+        {
+            "pickup_datetime": pd.Timestamp("2020-01-01 10:00:00")
+            + pd.to_timedelta(seconds, unit="s"),
+            "pickup_lon": rng.uniform(-74.0, -73.9, n),
+            "pickup_lat": rng.uniform(40.7, 40.8, n),
+            "dropoff_lon": rng.uniform(-74.0, -73.9, n),
+            "dropoff_lat": rng.uniform(40.7, 40.8, n),
+        }
+    )
+
+
+@pytest.mark.parametrize("map_match", [False, True])
+def test_streaming_demand(tmp_path, map_match):
+    path = str(tmp_path / "trips.feather")
+    create_trips().to_feather(path)
+
+    from_datetime = pd.to_datetime("2020-01-01 10:03:00")
+    to_datetime = pd.to_datetime("2020-01-01 10:15:00")
+
+    clock = Clock(time_step=1, time_unit="m", starting_time=from_datetime)
+    map_matcher = LinearRouter(clock) if map_match else None
+
+    replay = ReplayDemand(
+        clock, path, from_datetime, to_datetime, "1min", map_matcher=map_matcher
+    )
+    demand = StreamingDemand(
+        clock, path, from_datetime, to_datetime, map_matcher=map_matcher, batch_size=3
+    )
+
+    num_bookings = 0
+    for _ in range(15):
+        bookings = demand.next()
+        assert trips(bookings) == trips(replay.next())
+        num_bookings += len(bookings)
+        clock.tick()
+
+    assert num_bookings > 0
+    assert num_bookings == replay.data.shape[0]
+
+
+def test_streaming_demand_parquet(tmp_path):
+    path = str(tmp_path / "trips.feather")
+    # unsorted trips
+    trips_data = create_trips().sample(frac=1, random_state=1)
+    trips_data.reset_index(drop=True).to_feather(path)
+
+    from_datetime = pd.to_datetime("2020-01-01 10:00:00")
+    to_datetime = pd.to_datetime("2020-01-01 10:10:00")
+    clock = Clock(time_step=1, time_unit="m", starting_time=from_datetime)
+
+    with pytest.raises(Exception):
+        list(StreamingDemand(clock, path, from_datetime, to_datetime).buckets())
+
+    sorted_path = str(tmp_path / "trips.parquet")
+    sort_trips(path, sorted_path, row_group_size=5)
+
+    demand = StreamingDemand(clock, sorted_path, from_datetime, to_datetime)
+    buckets = list(demand.buckets())
+    times = [t for t, _ in buckets]
+    assert times == sorted(set(times))
+    assert times[0] >= 0 and times[-1] <= 10
+
+    replay = ReplayDemand(clock, path, from_datetime, to_datetime, "1min")
+    assert sum(len(b) for _, b in buckets) == replay.data.shape[0]
+
+    clock.set_clock_time(times[1])
+    assert len(demand.next()) > 0
+    assert demand.next_event_time() == times[2]
@@ -1,10 +1,11 @@
 import pytest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 from simobility.core.vehicle_engine import VehicleEngine
 from simobility.core import Clock, GeographicPosition, Booking, Vehicle
 from simobility.routers import LinearRouter
 from simobility.core import Itinerary, Fleet
 from simobility.core import Dispatcher
+from simobility.core.state_transitions import do_job
 
 
 def test_Dispatcher():
@@ -101,3 +102,50 @@ def test_Dispatcher_3():
     assert itinerary.current_job is job2
 
     assert booking.is_waiting_dropoff()
+
+
+def test_Dispatcher_wake_up():
+    clock = Clock()
+    router = LinearRouter(clock)
+
+    fleet = Fleet(clock, router)
+    vehicle = Vehicle(clock)
+    fleet.infleet(vehicle, GeographicPosition(13.3764, 52.5461))
+
+    cnt = Dispatcher()
+
+    booking = Booking(
+        clock,
+        GeographicPosition(13.4014, 52.5478),
+        GeographicPosition(13.3764, 52.5461),
+    )
+
+    itinerary = Itinerary(101, vehicle)
+    itinerary.move_to(GeographicPosition(13.4014, 52.5478))
+    itinerary.pickup(booking)
+    itinerary.dropoff(booking)
+
+    cnt.dispatch(itinerary)
+
+    with patch("simobility.core.dispatcher.do_job", wraps=do_job) as fn:
+        cnt.step()
+        assert fn.call_count == 1
+
+        eta = vehicle.engine.eta
+        assert eta > clock.now
+
+        # vehicle is moving - nothing to do until it arrives
+        while clock.now < eta - 1:
+            clock.tick()
+            fleet.step()
+            cnt.step()
+        assert fn.call_count == 1
+
+        clock.tick()
+        fleet.step()
+        cnt.step()
+        assert fn.call_count == 2
+
+    assert booking.is_complete()
+    assert cnt.get_itinerary(vehicle) is None
+    assert cnt.itineraries == {}
@@ -0,0 +1,172 @@
+import numpy as np
+import pytest
+from simobility.core import Clock, GeographicPosition, Vehicle, Fleet, GridIndex
+from simobility.core.vehicle import States
+from simobility.core.state_machine import TransitionTable
+from simobility.routers import LinearRouter
+from simobility.routers.route import Route
+
+
+def create_fleet(clock, columnar):
+    fleet = Fleet(clock, LinearRouter(clock), columnar=columnar)
+
+    positions = [
+        GeographicPosition(13.3764, 52.5461),
+        GeographicPosition(13.4014, 52.5478),
+        GeographicPosition(13.3393, 52.5053),
+    ]
+    for idx, pos in enumerate(positions):
+        fleet.infleet(Vehicle(clock, vehicle_id=str(idx)), pos)
+
+    return fleet
+
+
+def test_columnar_step():
+    destinations = [
+        GeographicPosition(13.4014, 52.5478),
+        GeographicPosition(13.3764, 52.5461),
+    ]
+
+    clock1 = Clock()
+    clock2 = Clock()
+    fleet1 = create_fleet(clock1, False)
+    fleet2 = create_fleet(clock2, True)
+
+    for fleet in (fleet1, fleet2):
+        for idx, dest in enumerate(destinations):
+            fleet.get_vehicle(str(idx)).move_to(dest)
+
+    for _ in range(10):
+        fleet1.step()
+        fleet2.step()
+
+        for vid in ("0", "1", "2"):
+            v1 = fleet1.get_vehicle(vid)
+            v2 = fleet2.get_vehicle(vid)
+            assert v1.state == v2.state
+            assert v1.position == v2.position
+
+        clock1.tick()
+        clock2.tick()
+
+    assert fleet2.store.slots(States.moving_to).size == 0
+    assert fleet2.store.slots(States.idling).tolist() == [0, 1, 2]
+
+
+def test_columnar_online_vehicles():
+    clock = Clock()
+    fleet = create_fleet(clock, True)
+
+    assert [v.id for v in fleet.get_online_vehicles()] == ["0", "1", "2"]
+
+    fleet.get_vehicle("1").set_offline()
+    assert [v.id for v in fleet.get_online_vehicles()] == ["0", "2"]
+
+
+def test_columnar_positions():
+    clock = Clock()
+    fleet = create_fleet(clock, True)
+
+    vehicle = fleet.get_vehicle("0")
+    vehicle.move_to(GeographicPosition(13.4014, 52.5478))
+    clock.tick()
+    clock.tick()
+
+    lon, lat = fleet.store.positions(np.arange(3), clock.now)
+
+    assert GeographicPosition(lon[0], lat[0]) == vehicle.position
+    assert (lon[1], lat[1]) == fleet.get_vehicle("1").position.coords
+
+
+def test_fleet_positions():
+    clock1 = Clock()
+    clock2 = Clock()
+    fleet1 = create_fleet(clock1, False)
+    fleet2 = create_fleet(clock2, True)
+
+    for fleet in (fleet1, fleet2):
+        fleet.get_vehicle("0").move_to(GeographicPosition(13.4014, 52.5478))
+        fleet.clock.tick()
+        fleet.clock.tick()
+
+    ids = ["2", "0", "1"]
+    assert fleet2.positions(ids) == fleet1.positions(ids)
+    assert fleet1.positions(ids) == [fleet1.get_vehicle(vid).position for vid in ids]
+
+
+class LRouter(LinearRouter):
+    """Routes go north first and then east"""
+
+    def calculate_route(self, origin, destination):
+        corner = GeographicPosition(origin.lon, destination.lat)
+        return Route(self.clock.now, [origin, corner, destination], 60, 10, origin, destination)
+
+
+def test_fleet_positions_geometry():
+    clock = Clock()
+    fleet = Fleet(clock, LRouter(clock), columnar=True)
+    fleet.infleet(Vehicle(clock, vehicle_id="0"), GeographicPosition(13.3, 52.5))
+    fleet.infleet(Vehicle(clock, vehicle_id="1"), GeographicPosition(13.4, 52.5))
+
+    vehicle = fleet.get_vehicle("0")
+    vehicle.move_to(GeographicPosition(13.4, 52.6))
+    for _ in range(30):
+        clock.tick()
+
+    # the straight line approximation is far from the route
+    lon, lat = fleet.store.positions(np.array([0]), clock.now)
+    assert GeographicPosition(lon[0], lat[0]) != vehicle.position
+
+    assert fleet.positions(["0", "1"]) == [vehicle.position, GeographicPosition(13.4, 52.5)]
+
+
+def test_store_transition_table():
+    clock = Clock()
+    fleet = create_fleet(clock, True)
+
+    vehicle = Vehicle(clock, vehicle_id="3")
+    vehicle._transition_table = TransitionTable([], list(States))
+    with pytest.raises(Exception):
+        fleet.infleet(vehicle, GeographicPosition(13.3764, 52.5461))
+
+    assert fleet.store.table is fleet.get_vehicle("0")._transition_table
+
+
+def test_columnar_step_inconsistent_state():
+    clock = Clock()
+    fleet = create_fleet(clock, True)
+
+    vehicle = fleet.get_vehicle("0")
+    vehicle.move_to(GeographicPosition(13.4014, 52.5478))
+    # the engine keeps moving while the vehicle is idling
+    vehicle.set_idling()
+
+    with pytest.raises(Exception, match="Undefined state"):
+        fleet.step()
+
+
+def test_idle_index():
+    clock = Clock()
+    fleet = Fleet(clock, LinearRouter(clock), idle_index=GridIndex(cell_size=0.5))
+
+    positions = [
+        GeographicPosition(13.3764, 52.5461),
+        GeographicPosition(13.4014, 52.5478),
+        GeographicPosition(13.3393, 52.5053),
+    ]
+    for idx, pos in enumerate(positions):
+        fleet.infleet(Vehicle(clock, vehicle_id=str(idx)), pos)
+
+    pickup = GeographicPosition(13.4, 52.547)
+    assert [v.id for v in fleet.nearest_idle_vehicles(pickup, 2)] == ["1", "0"]
+
+    vehicle = fleet.get_vehicle("1")
+    vehicle.move_to(GeographicPosition(13.3393, 52.5053))
+    assert [v.id for v in fleet.nearest_idle_vehicles(pickup, 2)] == ["0", "2"]
+
+    while vehicle.is_moving:
+        clock.tick()
+        fleet.step()
+
+    # vehicle is idling at the new position
+    assert [v.id for v in fleet.idle_vehicles_within(positions[2], 0.1)] == ["2", "1"]
@@ -1,5 +1,7 @@
 import pytest
-from simobility.routers import LinearRouter
+import numpy as np
+from simobility.routers import LinearRouter, Route
+from simobility.routers.base_router import BaseRouter
 from simobility.core import GeographicPosition
 from simobility.core.clock import Clock
 
@@ -87,3 +89,57 @@ def test_route_destination():
     router = LinearRouter(clock=clock)
 
     assert router.calculate_route(origin, destination).destination == destination
+
+
+@pytest.mark.parametrize(
+    "time_unit,time_step", [("m", 1), ("s", 1), ("s", 10), ("h", 1)]
+)
+def test_distance_matrix(time_unit, time_step):
+    clock = Clock(time_step=time_step, time_unit=time_unit)
+    router = LinearRouter(speed=23, clock=clock)
+
+    state = np.random.RandomState(11)
+    sources = [
+        GeographicPosition(lon, lat)
+        for lon, lat in zip(state.uniform(-74.1, -73.8, 40), state.uniform(40.6, 40.9, 40))
+    ]
+    destinations = sources[:7] + [GeographicPosition(-73.95, 40.75)]
+
+    matrix = router.calculate_distance_matrix(sources, destinations)
+    expected = BaseRouter.calculate_distance_matrix(router, sources, destinations)
+
+    assert matrix.shape == (len(sources), len(destinations))
+    np.testing.assert_array_equal(matrix, expected)
+
+    matrix = router.calculate_distance_matrix(sources, destinations, travel_time=False)
+    expected = BaseRouter.calculate_distance_matrix(router, sources, destinations, travel_time=False)
+    np.testing.assert_allclose(matrix, expected)
+
+    assert router.calculate_distance_matrix([], destinations).shape == (0, len(destinations))
+
+
+def test_linear_route():
+    clock = Clock(time_step=10, time_unit="s")
+    router = LinearRouter(speed=20, clock=clock)
+
+    origin = GeographicPosition(-73.935242, 40.730610)
+    destination = GeographicPosition(-73.9, 40.75)
+
+    route = router.calculate_route(origin, destination)
+    assert route.duration > 10
+    assert route._coordinates is None
+
+    # the same route with materialized waypoints
+    expected = Route(
+        route.created_at,
+        route.coordinates,
+        route.duration,
+        route.distance,
+        origin,
+        destination,
+    )
+    assert len(route.coordinates) == route.duration + 1
+
+    for t in range(route.duration + 3):
+        assert route.approximate_position(t) == expected.approximate_position(t)
+        assert route.traveled_distance(t) == expected.traveled_distance(t)
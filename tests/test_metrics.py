@@ -0,0 +1,123 @@
+import json
+import pandas as pd
+import pytest
+from simobility.core import Clock
+from simobility.core.metrics import calculate_metrics, MetricsCollector
+
+
+def vehicle(clock_time, vid, from_state, to_state, **details):
+    return {
+        "clock_time": clock_time,
+        "object_type": "vehicle",
+        "uuid": vid,
+        "from_state": from_state,
+        "to_state": to_state,
+        "details": details,
+    }
+
+
+def booking(clock_time, bid, from_state, to_state, **details):
+    return {
+        "clock_time": clock_time,
+        "object_type": "booking",
+        "uuid": bid,
+        "from_state": from_state,
+        "to_state": to_state,
+        "details": details,
+    }
+
+
+def move(clock_time, vid, duration, distance, **details):
+    return [
+        vehicle(clock_time, vid, "idling", "moving_to", trip_duration=0, trip_distance=0, **details),
+        vehicle(
+            clock_time + duration,
+            vid,
+            "moving_to",
+            "idling",
+            stop="arrived",
+            trip_duration=duration,
+            trip_distance=distance,
+            **details,
+        ),
+    ]
+
+
+@pytest.fixture
+def logs():
+    return [
+        vehicle(0, "v1", "offline", "idling"),
+        vehicle(0, "v2", "offline", "idling"),
+        vehicle(0, "v3", "offline", "idling"),
+        booking(1, "b1", "created", "pending"),
+        booking(1, "b2", "created", "pending"),
+        booking(2, "b3", "created", "pending"),
+        booking(3, "b4", "created", "pending"),
+        *move(2, "v1", 5, 1.5, pickup="b1"),
+        booking(7, "b1", "waiting_pickup", "pickup", vid="v1"),
+        *move(7, "v1", 10, 4.0, dropoff="b1"),
+        booking(17, "b1", "waiting_dropoff", "dropoff", vid="v1"),
+        *move(3, "v2", 12, 2.5, pickup="b2"),
+        booking(15, "b2", "waiting_pickup", "pickup", vid="v2"),
+        vehicle(15, "v2", "idling", "moving_to", trip_duration=0, trip_distance=0, dropoff="b2"),
+        booking(8, "b3", "pending", "expired"),
+        *move(20, "v1", 3, 0.5),
+    ]
+
+
+def test_calculate_metrics(logs):
+    clock = Clock(time_step=10, time_unit="s")
+    clock.clock_time = 30
+
+    metrics = calculate_metrics(pd.DataFrame(logs), clock)
+
+    assert metrics == pytest.approx(
+        {
+            "num_vehicles": 3,
+            "created": 4,
+            "expired": 1,
+            "pickups": 2,
+            "dropoffs": 1,
+            "pickup_rate": 50,
+            "avg_waiting_time": 100,
+            "avg_trip_time": 100,
+            "avg_utilization": 50,
+            "fleet_utilization": 100 / 3,
+            "avg_paid_utilization": 100 / 3,
+            "fleet_paid_utilization": 100 / 9,
+            "total_distance": 8.5,
+            "empty_distance": 4.0,
+            "empty_distance_pcnt": 4 / 8.5 * 100,
+        }
+    )
+
+
+def test_calculate_metrics_columns(logs):
+    clock = Clock(time_step=10, time_unit="s")
+    clock.clock_time = 30
+
+    data = pd.DataFrame(logs)
+    expected = calculate_metrics(data, clock)
+
+    # details read from a file without parsing
+    json_details = data.assign(details=[json.dumps(d) for d in data.details])
+    assert calculate_metrics(json_details, clock) == expected
+
+    categorical = data.astype({c: "category" for c in ["object_type", "uuid", "to_state"]})
+    assert calculate_metrics(categorical, clock) == expected
+
+
+def test_metrics_collector(logs):
+    clock = Clock(time_step=10, time_unit="s")
+    collector = MetricsCollector(clock)
+
+    for log in logs:
+        collector.write(log)
+
+    clock.clock_time = 30
+    expected = calculate_metrics(pd.DataFrame(logs), clock)
+    assert collector.metrics() == pytest.approx(expected)
+
+    # only b2 (picked up) and b4 (pending) are still tracked
+    assert collector.num_active_bookings == 2
+
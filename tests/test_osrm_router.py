@@ -0,0 +1,170 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+import pytest
+from simobility.core import GeographicPosition
+from simobility.core.clock import Clock
+from simobility.routers import OSRMRouter
+
+
+def table_duration(src, dst):
+    """Travel time in seconds"""
+    return 60000 * (abs(src[0] - dst[0]) + abs(src[1] - dst[1]))
+
+
+class StubOSRMHandler(BaseHTTPRequestHandler):
+    """Answers OSRM requests: nearest returns the same point, routes are
+    straight lines that take 10 minutes"""
+
+    # keep-alive connections
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def send_error_response(self, code, body=b""):
+        self.send_response(code)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.num_requests += 1
+            fail = server.failures > 0
+            server.failures -= 1
+
+        if fail:
+            self.send_error_response(503)
+            return
+
+        url = urlsplit(self.path)
+        service = url.path.split("/")[1]
+        coords = url.path.split("/")[-1].split(";")
+        points = [list(map(float, c.split(","))) for c in coords]
+
+        if service == "nearest":
+            data = {"waypoints": [{"location": points[0]}]}
+        elif service == "route":
+            data = {
+                "routes": [
+                    {"geometry": {"coordinates": points}, "duration": 600, "distance": 1000}
+                ]
+            }
+        elif service == "table":
+            query = parse_qs(url.query)
+            sources = [points[int(i)] for i in query["sources"][0].split(";")]
+            destinations = [points[int(i)] for i in query["destinations"][0].split(";")]
+            data = {
+                "durations": [
+                    [table_duration(src, dst) for dst in destinations] for src in sources
+                ]
+            }
+        else:
+            self.send_error_response(400, b"Unknown service")
+            return
+
+        body = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def osrm_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubOSRMHandler)
+    server.lock = threading.Lock()
+    server.num_requests = 0
+    server.failures = 0
+
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def create_router(server, **kwargs):
+    clock = Clock(time_step=1, time_unit="m")
+    host, port = server.server_address
+    return OSRMRouter(clock, f"http://{host}:{port}", **kwargs)
+
+
+def test_map_match(osrm_server):
+    router = create_router(osrm_server)
+    pos = GeographicPosition(-73.935242, 40.730610)
+    assert router.map_match(pos) == pos
+
+    positions = [GeographicPosition(-73.9 - i * 0.001, 40.7) for i in range(20)]
+    matched = router.map_match_many(positions)
+    assert [p.coords for p in matched] == [p.coords for p in positions]
+    assert osrm_server.num_requests == 21
+    router.close()
+
+
+def test_calculate_routes(osrm_server):
+    router = create_router(osrm_server, pool_size=4)
+    origin = GeographicPosition(-73.935242, 40.730610)
+    pairs = [(origin, GeographicPosition(-73.9, 40.7 + i * 0.001)) for i in range(10)]
+
+    routes = router.calculate_routes(pairs)
+    assert len(routes) == 10
+    for route, (o, d) in zip(routes, pairs):
+        assert route.duration == 10
+        assert route.distance == 1
+        assert route.origin is o
+        assert route.coordinates[-1] == d
+
+    route = router.calculate_route(*pairs[0])
+    assert route.coordinates[-1] == pairs[0][1]
+    router.close()
+
+
+def test_retries(osrm_server):
+    pos = GeographicPosition(-73.935242, 40.730610)
+
+    osrm_server.failures = 2
+    router = create_router(osrm_server, retries=3)
+    assert router.map_match(pos) == pos
+    assert osrm_server.num_requests == 3
+
+    osrm_server.failures = 2
+    router = create_router(osrm_server, retries=1)
+    with pytest.raises(Exception):
+        router.map_match(pos)
+
+
+def test_distance_matrix_tiles(osrm_server):
+    sources = [GeographicPosition(-73.9 - i * 0.01, 40.7) for i in range(7)]
+    destinations = [GeographicPosition(-73.9, 40.7 + i * 0.01) for i in range(5)]
+
+    router = create_router(osrm_server)
+    assert len(router.table_tiles(7, 5)) == 1
+    expected = router.calculate_distance_matrix(sources, destinations)
+    assert osrm_server.num_requests == 1
+
+    for src, row in zip(sources, expected):
+        for dst, value in zip(destinations, row):
+            seconds = table_duration(src.coords, dst.coords)
+            assert value == router.clock.time_to_clock_time(seconds / 60, "m")
+
+    # up to 9 pairs in a request
+    router = create_router(osrm_server, max_table_size=3)
+    tiles = router.table_tiles(7, 5)
+    assert len(tiles) == 6
+    for rows, cols in tiles:
+        assert len(range(7)[rows]) * len(range(5)[cols]) <= 9
+
+    matrix = router.calculate_distance_matrix(sources, destinations)
+    assert osrm_server.num_requests == 7
+    assert (matrix == expected).all()
+
+    # url length limit
+    router = create_router(osrm_server, max_url_length=150)
+    for rows, cols in router.table_tiles(7, 5):
+        assert len(range(7)[rows]) + len(range(5)[cols]) <= 5
+    assert (router.calculate_distance_matrix(sources, destinations) == expected).all()
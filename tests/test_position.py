@@ -9,3 +9,18 @@ def test_position():
     assert pytest.approx(p1.distance(p2), 0.2) == 7.31
     assert p1.distance(p2) == p2.distance(p1)
     assert p1.distance(p1) == 0
+
+
+def test_compact_position():
+    p1 = GeographicPosition(-0.3927612, 39.4441473)
+    p2 = GeographicPosition(-0.3927612, 39.4441473)
+
+    assert not hasattr(p1, "__dict__")
+    assert p1.coords == (p1.lon, p1.lat)
+    assert p1 == p2
+    assert p1.id != p2.id
+    assert p1.id == p1.id
+
+    assert GeographicPosition.interned(*p1.coords) is GeographicPosition.interned(
+        *p2.coords
+    )
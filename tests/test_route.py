@@ -0,0 +1,39 @@
+import pytest
+from simobility.core import GeographicPosition
+from simobility.routers import Route
+from simobility.routers.utils import linear_approximation
+
+
+def test_approximate_position():
+    coordinates = [
+        GeographicPosition(-73.935242, 40.730610),
+        GeographicPosition(-73.93, 40.7306),
+        GeographicPosition(-73.929, 40.74),
+        GeographicPosition(-73.929, 40.74),
+        GeographicPosition(-73.91, 40.75),
+    ]
+    seg_distance = [p1.distance(p2) for p1, p2 in zip(coordinates, coordinates[1:])]
+    points = [p.coords for p in coordinates]
+
+    route = Route(5, coordinates, 12, sum(seg_distance), coordinates[0], coordinates[-1])
+
+    times = list(range(5, 20))
+    positions = route.approximate_positions(times)
+    assert len(positions) == len(times)
+
+    for t, pos in zip(times, positions):
+        pcnt = min(1, (t - 5) / 12)
+        expected = linear_approximation(pcnt, points, seg_distance)
+        assert pos.coords == pytest.approx(expected)
+        assert route.approximate_position(t).coords == pos.coords
+
+    assert route.approximate_position(5) == coordinates[0]
+    assert route.approximate_position(17) == coordinates[-1]
+
+
+def test_single_point_route():
+    pos = GeographicPosition(-73.935242, 40.730610)
+    route = Route(0, [pos], 0, 0, pos, pos)
+
+    assert route.approximate_position(3) == pos
+    assert route.approximate_positions([0, 1]) == [pos, pos]
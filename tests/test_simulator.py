@@ -0,0 +1,285 @@
+import json
+import logging
+import pytest
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from simobility.core import Clock, GeographicPosition, Vehicle, Fleet, Booking
+from simobility.core import BookingService, Dispatcher
+from simobility.core import loggers
+from simobility.core.loggers import InMemoryLogHandler, get_simobility_logger
+from simobility.core.loggers import CSVFileHandler, LogHandlerSink
+from simobility.core.state_log import ArrowStateLogWriter, read_state_log
+from simobility.core.state_log import BackgroundStateLogWriter, ColumnarLogHandler
+from simobility.core.metrics import calculate_metrics, MetricsCollector
+from simobility.core.tools import basic_booking_itinerary
+from simobility.routers import LinearRouter
+from simobility.simulator.simulator import Simulator, EventSimulator, Context
+
+
+class ScheduledDemand:
+    def __init__(self, clock, schedule):
+        self.clock = clock
+        self.schedule = schedule
+
+    def next(self):
+        bookings = []
+        for idx, (pu, do) in enumerate(self.schedule.get(self.clock.now, [])):
+            bid = f"{self.clock.now}-{idx}"
+            bookings.append(Booking(self.clock, GeographicPosition(*pu), GeographicPosition(*do), booking_id=bid))
+        return bookings
+
+    def next_event_time(self):
+        times = [t for t in self.schedule if t > self.clock.now]
+        return min(times, default=None)
+
+
+class FirstVehicleMatcher:
+    def __init__(self, context):
+        self.clock = context.clock
+        self.fleet = context.fleet
+        self.booking_service = context.booking_service
+        self.dispatcher = context.dispatcher
+
+    def step(self):
+        vehicles = [
+            v for v in self.fleet.get_online_vehicles() if self.dispatcher.get_itinerary(v) is None
+        ]
+        itineraries = []
+        for booking in self.booking_service.get_pending_bookings():
+            if vehicles and booking.is_pending():
+                vehicle = vehicles.pop(0)
+                itineraries.append(basic_booking_itinerary(self.clock.now, vehicle, booking))
+        return itineraries
+
+
+@pytest.fixture
+def simulation_logs():
+    handler = InMemoryLogHandler()
+    logger = get_simobility_logger(handler)
+    level = logger.level
+    logger.setLevel(logging.INFO)
+
+    yield handler.logs
+
+    logger.setLevel(level)
+    logger.removeHandler(handler)
+
+
+def run(simulator_cls, columnar=False, clock=None):
+    clock = clock or Clock(time_step=10, time_unit="s")
+    fleet = Fleet(clock, LinearRouter(clock), columnar=columnar)
+    fleet.infleet(Vehicle(clock, vehicle_id="v1"), GeographicPosition(13.3764, 52.5461))
+
+    context = Context(clock, fleet, BookingService(clock, 3), Dispatcher())
+
+    schedule = {
+        2: [((13.4014, 52.5478), (13.3393, 52.5053))],
+        5: [((13.3764, 52.5461), (13.4014, 52.5478))],
+        300: [((13.3393, 52.5053), (13.3764, 52.5461))],
+    }
+    demand = ScheduledDemand(clock, schedule)
+
+    simulator = simulator_cls(FirstVehicleMatcher(context), context)
+    simulator.simulate(demand, 120)
+    return clock
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_event_simulator(simulation_logs, columnar):
+    clock = run(Simulator, columnar)
+    tick_logs = [dict(log, itinerary_id=None) for log in simulation_logs]
+    simulation_logs.clear()
+
+    event_clock = run(EventSimulator, columnar)
+    event_logs = [dict(log, itinerary_id=None) for log in simulation_logs]
+
+    assert event_clock.now == clock.now
+    assert len(tick_logs) > 0
+    assert event_logs == tick_logs
+
+    # the second booking expires while the only vehicle is busy
+    assert "expired" in [log["to_state"] for log in event_logs]
+
+
+def test_event_simulator_skips_steps(monkeypatch):
+    steps = []
+    step = Simulator.step
+
+    def count_steps(self, demand):
+        steps.append(self.clock.now)
+        return step(self, demand)
+
+    monkeypatch.setattr(Simulator, "step", count_steps)
+
+    clock = run(EventSimulator)
+
+    assert steps[0] == 0
+    assert steps == sorted(set(steps))
+    assert len(steps) < clock.now / 10
+
+
+@pytest.mark.parametrize("file_name", ["logs.arrow", "logs.parquet"])
+def test_state_log_writer(simulation_logs, tmp_path, file_name):
+    file_name = str(tmp_path / file_name)
+    writer = ArrowStateLogWriter(file_name, buffer_size=7)
+
+    loggers.add_state_change_sink(writer)
+    try:
+        run(Simulator)
+    finally:
+        loggers.remove_state_change_sink(writer)
+    writer.close()
+
+    data = read_state_log(file_name)
+    assert len(data) == len(simulation_logs)
+
+    for row, log in zip(data.to_dict("records"), simulation_logs):
+        for column in ["clock_time", "object_type", "uuid", "from_state", "to_state"]:
+            assert row[column] == log[column]
+        assert row["lon"] == log["position"]["lon"]
+        assert row["lat"] == log["position"]["lat"]
+        assert row["details"] == json.loads(json.dumps(log["details"], default=str))
+
+
+class ListSink:
+    def __init__(self):
+        self.records = []
+        self.flushed = 0
+        self.closed = False
+
+    def write(self, state_info):
+        self.records.append(state_info)
+
+    def flush(self):
+        self.flushed += 1
+
+    def close(self):
+        self.closed = True
+
+
+def test_background_writer(simulation_logs, tmp_path):
+    sink = ListSink()
+    # small queue to test back-pressure
+    writer = BackgroundStateLogWriter(sink, chunk_size=2, max_chunks=1)
+
+    loggers.add_state_change_sink(writer)
+    try:
+        run(Simulator)
+    finally:
+        loggers.remove_state_change_sink(writer)
+
+    # simulate flushes sinks
+    assert sink.flushed == 1
+    assert sink.records == simulation_logs
+
+    writer.close()
+    assert sink.closed
+    with pytest.raises(Exception):
+        writer.write({})
+        writer.flush()
+
+
+def test_background_csv_writer(simulation_logs, tmp_path):
+    file_name = str(tmp_path / "logs.csv")
+    handler = CSVFileHandler(file_name, "w")
+    writer = BackgroundStateLogWriter(LogHandlerSink(handler))
+
+    loggers.add_state_change_sink(writer)
+    try:
+        run(Simulator)
+    finally:
+        loggers.remove_state_change_sink(writer)
+    writer.close()
+
+    with open(file_name) as f:
+        lines = f.read().splitlines()
+
+    assert len(lines) == len(simulation_logs)
+    assert lines[0].split(";")[2] == simulation_logs[0]["uuid"]
+
+
+def test_background_writer_error():
+    class FailingSink(ListSink):
+        def write(self, state_info):
+            raise ValueError("disk is full")
+
+    writer = BackgroundStateLogWriter(FailingSink(), chunk_size=1)
+    writer.write({})
+    with pytest.raises(Exception):
+        writer.flush()
+    with pytest.raises(Exception):
+        writer.close()
+
+
+def test_columnar_log_handler(simulation_logs):
+    handler = ColumnarLogHandler(capacity=2)
+    logger = get_simobility_logger(handler)
+    try:
+        run(Simulator)
+    finally:
+        logger.removeHandler(handler)
+
+    assert handler.size == len(simulation_logs)
+
+    data = handler.to_pandas()
+    assert isinstance(data.uuid.dtype, pd.CategoricalDtype)
+    assert data.itinerary_id.isna().any()
+
+    expected = pd.DataFrame(simulation_logs)
+    for column in ["clock_time", "object_type", "uuid", "itinerary_id", "from_state", "to_state"]:
+        values = data[column].astype(object).where(data[column].notna(), None)
+        assert values.tolist() == [log[column] for log in simulation_logs]
+    assert data.lon.tolist() == [p["lon"] for p in expected.position]
+
+    # details are stored in columns
+    assert data.details.isna().all()
+    for row, log in zip(data.to_dict("records"), simulation_logs):
+        details = {}
+        for key in ["stop", "pickup", "dropoff", "vid", "trip_distance", "trip_duration"]:
+            if key in row and not pd.isna(row[key]):
+                details[key] = row[key]
+        for key in ["origin", "destination", "dropoff"]:
+            if not pd.isna(row.get(f"{key}_lon", float("nan"))):
+                details[key] = {"lat": row[f"{key}_lat"], "lon": row[f"{key}_lon"]}
+        assert details == log["details"]
+
+    clock = Clock(time_step=10, time_unit="s")
+    clock.clock_time = int(expected.clock_time.max())
+    assert calculate_metrics(data, clock) == calculate_metrics(expected, clock)
+
+    table = handler.to_arrow()
+    assert table.num_rows == len(simulation_logs)
+    assert table.column_names == list(data.columns)
+    assert pa.types.is_dictionary(table.schema.field("to_state").type)
+    assert pa.types.is_dictionary(table.schema.field("stop").type)
+    assert table.column("to_state").to_pylist() == expected.to_state.tolist()
+    np.testing.assert_array_equal(table.column("trip_duration").to_numpy(), data.trip_duration)
+
+    handler.clear()
+    assert handler.size == 0
+    assert len(handler.to_pandas()) == 0
+
+    # rare keys are stored as json
+    state_info = dict(simulation_logs[0], details={"stop": "arrived", "reason": [1, 2]})
+    handler.write(state_info)
+    data = handler.to_pandas()
+    assert data.stop[0] == "arrived"
+    assert json.loads(data.details[0]) == {"reason": [1, 2]}
+    assert handler.to_arrow().column("details").to_pylist() == [data.details[0]]
+
+
+def test_metrics_collector_simulation(simulation_logs):
+    clock = Clock(time_step=10, time_unit="s")
+    collector = MetricsCollector(clock)
+    assert pd.isna(collector.metrics()["pickup_rate"])
+
+    loggers.add_state_change_sink(collector)
+    try:
+        run(Simulator, clock=clock)
+    finally:
+        loggers.remove_state_change_sink(collector)
+
+    expected = calculate_metrics(pd.DataFrame(simulation_logs), clock)
+    assert collector.metrics() == pytest.approx(expected, nan_ok=True)
+    assert collector.num_active_bookings == 0
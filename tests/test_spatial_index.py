@@ -0,0 +1,54 @@
+import numpy as np
+from simobility.core import GridIndex, GeographicPosition
+
+
+def create_positions(n, seed=0):
+    state = np.random.RandomState(seed)
+    return [
+        GeographicPosition(lon, lat)
+        for lon, lat in zip(state.uniform(-74.1, -73.8, n), state.uniform(40.6, 40.9, n))
+    ]
+
+
+def test_nearest():
+    positions = create_positions(300)
+    index = GridIndex(cell_size=0.7)
+    for idx, pos in enumerate(positions):
+        index.insert(idx, pos)
+
+    assert len(index) == len(positions)
+
+    for query in create_positions(20, seed=1):
+        expected = sorted(range(len(positions)), key=lambda i: query.distance(positions[i]))
+
+        found = index.nearest(query, k=5)
+        assert [key for key, _ in found] == expected[:5]
+        for key, distance in found:
+            assert abs(distance - query.distance(positions[key])) < 1e-6
+
+        found = index.within(query, 2.5)
+        expected = [i for i in expected if query.distance(positions[i]) <= 2.5]
+        assert [key for key, _ in found] == expected
+
+
+def test_update_remove():
+    index = GridIndex(cell_size=0.5)
+    p1 = GeographicPosition(-73.99, 40.71)
+    p2 = GeographicPosition(-73.95, 40.75)
+
+    index.insert("a", p1)
+    index.insert("b", p2)
+    assert [k for k, _ in index.nearest(p1, 2)] == ["a", "b"]
+
+    # move "b" to p1
+    index.insert("b", p1)
+    assert len(index) == 2
+    assert index.within(p2, 0.1) == []
+
+    index.remove("a")
+    index.remove("a")
+    assert "a" not in index
+    assert [k for k, _ in index.nearest(p2, 3)] == ["b"]
+
+    index.remove("b")
+    assert index.nearest(p2, 3) == []
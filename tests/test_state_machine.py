@@ -3,10 +3,8 @@ from unittest.mock import MagicMock
 from enum import Enum
 import json
 from collections import OrderedDict
-from transitions.core import EventData
-from transitions import MachineError
 
-from simobility.core.state_machine import StateMachine
+from simobility.core.state_machine import StateMachine, StateChange, MachineError
 from simobility.core import Clock
 
 
@@ -72,7 +70,7 @@ def test_on_state_changed():
 
     event_data = machine.on_state_changed.call_args[0][0]
 
-    assert isinstance(event_data, EventData)
+    assert isinstance(event_data, StateChange)
     assert event_data.transition.source == TstStates.STATE1.name
     assert event_data.transition.dest == TstStates.STATE2.name
     assert event_data.kwargs == {}
@@ -126,3 +124,69 @@ def test_itinerary_id():
     assert "itinerary_id" not in state_info["details"]
 
     assert state_info["details"] == {"val": 23}
+
+
+def test_transition_table_shared():
+    machine1 = create_state_machine()
+    machine1.on_state_changed = MagicMock()
+
+    assert machine1._transition_table is create_state_machine()._transition_table
+    # generated methods are not added to the base class
+    assert "set_state2" not in StateMachine.__dict__
+
+    machine1.set_state2()
+    with pytest.raises(MachineError):
+        machine1.set_state1()
+
+    # failed trigger doesn't change the state
+    assert machine1.is_STATE2()
+    assert not machine1.is_STATE1()
+
+    machine1.set_state3()
+    event_data = machine1.on_state_changed.call_args[0][0]
+    assert event_data.transition.source == TstStates.STATE2.name
+    assert event_data.transition.dest == TstStates.STATE3.name
+
+
+def test_compiled_once_per_class():
+    from simobility.core import Booking, GeographicPosition
+
+    clock = Clock()
+    b1 = Booking(clock, GeographicPosition(13.4014, 52.5478), GeographicPosition(13.3393, 52.5053))
+    b2 = Booking(clock, GeographicPosition(13.4014, 52.5478), GeographicPosition(13.3393, 52.5053))
+
+    assert b1._transition_table is b2._transition_table
+    assert "_state_machine" not in b1.__dict__
+
+    b1.set_matched()
+    assert b1.is_matched()
+    assert b2.is_pending()
+
+
+class OtherStates(Enum):
+
+    P = "p"
+    Q = "q"
+
+
+def test_different_transitions_of_same_class():
+    machine1 = create_state_machine()
+    machine1.process_state_change = MagicMock()
+
+    # a new list for each instance
+    transitions = [["set_q", [OtherStates.P], OtherStates.Q]]
+    machine2 = StateMachine(Clock(), transitions, list(OtherStates), OtherStates.P)
+    machine2.process_state_change = MagicMock()
+
+    assert machine1.state == TstStates.STATE1
+    assert machine2.state == OtherStates.P
+    assert not hasattr(machine1, "set_q")
+
+    machine1.set_state2()
+    machine2.set_q()
+    assert machine1.state == TstStates.STATE2
+    assert machine2.is_Q()
+
+    transitions = [["set_q", [OtherStates.P], OtherStates.Q]]
+    machine3 = StateMachine(Clock(), transitions, list(OtherStates), OtherStates.P)
+    assert machine3._transition_table is machine2._transition_table
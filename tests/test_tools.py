@@ -0,0 +1,71 @@
+import pandas as pd
+from unittest.mock import MagicMock
+from simobility.core.clock import Clock
+from simobility.core.tools import ReplayDemand
+from simobility.routers import LinearRouter
+
+
+def create_demand_file(path):
+    data = pd.DataFrame(
+        {
+            "pickup_datetime": pd.to_datetime(
+                ["2020-01-01 10:00:00", "2020-01-01 10:00:00", "2020-01-01 10:02:00"]
+            ),
+            "pickup_lon": [-73.95, -73.96, -73.97],
+            "pickup_lat": [40.75, 40.76, 40.77],
+            "dropoff_lon": [-73.90, -73.91, -73.92],
+            "dropoff_lat": [40.70, 40.71, 40.72],
+        }
+    )
+    data.to_feather(path)
+
+
+def create_demand(tmp_path, **kwargs):
+    path = str(tmp_path / "demand.feather")
+    create_demand_file(path)
+
+    clock = Clock(time_step=1, time_unit="m", starting_time="2020-01-01 10:00:00")
+    router = LinearRouter(clock)
+    router.map_match_many = MagicMock(wraps=router.map_match_many)
+
+    demand = ReplayDemand(
+        clock,
+        path,
+        pd.to_datetime("2020-01-01 10:00:00"),
+        pd.to_datetime("2020-01-01 11:00:00"),
+        round_to="1min",
+        map_matcher=router,
+        **kwargs
+    )
+    return clock, router, demand
+
+
+def test_map_match_batches(tmp_path):
+    clock, router, demand = create_demand(tmp_path)
+
+    bookings = demand.next()
+    assert len(bookings) == 2
+    assert bookings[0].pickup.coords == (-73.95, 40.75)
+    assert bookings[1].dropoff.coords == (-73.91, 40.71)
+
+    # pickups and dropoffs of a batch are matched at once
+    assert router.map_match_many.call_count == 1
+    assert len(router.map_match_many.call_args[0][0]) == 4
+
+    clock.tick()
+    assert demand.next() == []
+    clock.tick()
+    assert len(demand.next()) == 1
+    assert router.map_match_many.call_count == 2
+
+
+def test_map_match_ahead(tmp_path):
+    clock, router, demand = create_demand(tmp_path, map_match_ahead=True)
+    assert router.map_match_many.call_count == 1
+    assert len(router.map_match_many.call_args[0][0]) == 6
+
+    assert len(demand.next()) == 2
+    clock.tick()
+    clock.tick()
+    assert len(demand.next()) == 1
+    assert router.map_match_many.call_count == 1